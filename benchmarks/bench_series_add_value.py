@@ -0,0 +1,54 @@
+"""This benchmark measures building of KnoemaSeries point by point
+
+The time of KnoemaSeries.add_value is compared with membership check against the list of index points,
+which was used before. Run it from the root of the repository:
+
+    python benchmarks/bench_series_add_value.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knoema.data_reader import KnoemaSeries
+
+def get_points(count):
+    # daily points where every tenth point is repeated, as pivot responses may contain duplicates
+    start = datetime(2000, 1, 1)
+    points = []
+    for i in range(count):
+        points.append(start + timedelta(days=i))
+        if i % 10 == 0:
+            points.append(start + timedelta(days=i))
+    return points
+
+def build_series(points):
+    series = KnoemaSeries(('Series',), [], [], None)
+    for i, point in enumerate(points):
+        series.add_value(i, point)
+    return series
+
+def build_list(points):
+    values = []
+    index = []
+    for i, point in enumerate(points):
+        if point not in index:
+            values.append(i)
+            index.append(point)
+    return index
+
+def main():
+    print('{:>8} {:>12} {:>12}'.format('points', 'list, s', 'series, s'))
+    for count in (1000, 2000, 4000, 8000, 16000):
+        points = get_points(count)
+        assert build_series(points).index == build_list(points)
+
+        list_time = min(timeit.repeat(lambda: build_list(points), number=1, repeat=3))
+        series_time = min(timeit.repeat(lambda: build_series(points), number=1, repeat=3))
+        print('{:>8} {:>12.4f} {:>12.4f}'.format(count, list_time, series_time))
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 """This is main package module"""
 
+import inspect
 from knoema.api_config import ApiConfig
 from knoema.api_client import ApiClient
+from knoema.api_client_async import AsyncApiClient, run_async
+from knoema.api_transport import RetryPolicy
+from knoema.api_session import get_registry, session
 from knoema.data_reader import MnemonicsDataReader, StreamingDataReader, TransformationDataReader
 from knoema.data_reader import DimensionMetadataReader
 from knoema.api_definitions import is_equal_strings_ignore_case
@@ -9,11 +13,13 @@ from knoema.api_definitions_sema import Company
 from knoema.api_definitions_search import SearchResults
 from knoema.upload_frame import FrameTransformerFactory, FileLayerWrapper
 
+def _get_client():
+    return get_registry().get_client(ApiConfig())
+
 def dataset(id):
     """Use this function to get dataset metadata."""
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
 
     ds = client.get_dataset_meta(id)
@@ -30,8 +36,7 @@ def dataset(id):
 def dimension(dataset, dimension):
     """Use this function to get dimension metadata"""
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
 
     if not dataset:
@@ -44,14 +49,39 @@ def dimension(dataset, dimension):
 
     return reader.get()
 
-def get(dataset = None, include_metadata = False, mnemonics = None, transform = None, separator = None, group_by = None, columns = None, **dim_values):
+def get(dataset = None, include_metadata = False, mnemonics = None, transform = None, separator = None, group_by = None, columns = None, layout = None, backend = 'pandas', **dim_values):
     """Use this function to get data from Knoema dataset."""
 
+    return _get(dataset, include_metadata, mnemonics, transform, separator, group_by, columns, layout, backend, dim_values)
+
+def iter_get(dataset = None, include_metadata = False, mnemonics = None, transform = None, separator = None, group_by = None, columns = None, layout = None, backend = 'pandas', series_per_frame = None, **dim_values):
+    """Use this function to get data from Knoema dataset frame by frame.
+    A frame is yielded for every page of data or for every series_per_frame series, so the whole result is not kept in memory."""
+
+    return _get(dataset, include_metadata, mnemonics, transform, separator, group_by, columns, layout, backend, dim_values, True, series_per_frame)
+
+def _get(dataset, include_metadata, mnemonics, transform, separator, group_by, columns, layout, backend, dim_values, iterate = False, series_per_frame = None):
+
     if not dataset and not mnemonics:
         raise ValueError('Dataset id is not specified')
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    if backend not in ('pandas', 'arrow', 'polars'):
+        raise ValueError('Backend should be pandas, arrow or polars')
+
+    # Arrow and Polars frames contain one row per observation
+    if layout is None:
+        layout = 'wide' if backend == 'pandas' else 'long'
+
+    if layout not in ('wide', 'long'):
+        raise ValueError('Layout should be wide or long')
+
+    if layout == 'wide' and backend != 'pandas':
+        raise ValueError('Wide layout is supported only by pandas backend')
+
+    if series_per_frame is not None and (not isinstance(series_per_frame, int) or isinstance(series_per_frame, bool) or series_per_frame < 1):
+        raise ValueError('series_per_frame should be a positive integer')
+
+    client = _get_client()
     client.check_correct_host()
 
     ds = client.get_dataset(dataset) if dataset else None
@@ -118,17 +148,22 @@ def get(dataset = None, include_metadata = False, mnemonics = None, transform =
     
     if advanced and (group_by or columns):
         raise ValueError('Advanced time modes and multiple frequencies can\'t be used with group_by or columns parameters')
+
+    if layout == 'long' and group_by:
+        raise ValueError('Long layout and Arrow or Polars backends can\'t be used with group_by parameter')
     
     if mnemonics:
         reader =  MnemonicsDataReader(client, mnemonics, transform, frequency)
         reader.columns = columns
         reader.include_metadata = include_metadata
+        reader.layout = layout
+        reader.backend = backend
         reader.dataset = ds
 
         if separator:
             reader.separator = separator
             
-        return reader.get_pandasframe()
+        return reader.iter_pandasframes(series_per_frame) if iterate else reader.get_pandasframe()
     
     if not dataset:
         raise ValueError('Dataset id is not specified')
@@ -143,7 +178,7 @@ def get(dataset = None, include_metadata = False, mnemonics = None, transform =
 
         metadata = metadata_reader.get_series_metadata()
 
-        reader = StreamingDataReader(client, None, transform, group_by)
+        reader = StreamingDataReader(client, None, transform, group_by, ApiConfig().max_chunks_in_flight)
         reader.columns = columns
         reader.include_metadata = include_metadata
         reader.dataset = ds
@@ -160,12 +195,15 @@ def get(dataset = None, include_metadata = False, mnemonics = None, transform =
 
     reader.columns = columns
     reader.include_metadata = include_metadata
+    reader.layout = layout
+    reader.backend = backend
+    reader.max_chunks_in_flight = ApiConfig().max_chunks_in_flight
     reader.dataset = ds
 
     if separator:
         reader.separator = separator
             
-    return reader.get_pandasframe()
+    return reader.iter_pandasframes(series_per_frame) if iterate else reader.get_pandasframe()
 
 def ticker(ticker):
     """Use this function to get data about company"""
@@ -173,8 +211,7 @@ def ticker(ticker):
     if not ticker:
         raise ValueError('Ticker or company name is not specified')
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
 
     company_int = client.get_company_info(ticker)
@@ -187,8 +224,7 @@ def search(query):
     if not query:
         raise ValueError('Query is not specified')
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
 
     search_results_int = client.search(query)
@@ -205,8 +241,7 @@ def search(query):
 def upload(file_path_or_frame, dataset=None, public=False, name = None):
     """Use this function to upload data to Knoema dataset."""
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
 
     if isinstance(file_path_or_frame, str):
         return client.upload(file_path_or_frame, dataset, public, name)
@@ -220,8 +255,7 @@ def upload(file_path_or_frame, dataset=None, public=False, name = None):
 def delete(dataset):
     """Use this function to delete dataset by it's id."""
     
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
     client.delete(dataset)
     return ('Dataset {} has been deleted successfully'.format(dataset))
@@ -229,8 +263,27 @@ def delete(dataset):
 def verify(dataset, publication_date, source, refernce_url):
     """Use this function to verify a dataset."""
 
-    config = ApiConfig()
-    client = ApiClient(config.host, config.app_id, config.app_secret)
+    client = _get_client()
     client.check_correct_host()
     client.verify(dataset, publication_date, source, refernce_url)
-    
\ No newline at end of file
+    
+
+async def dataset_async(id):
+    """Use this function to get dataset metadata without blocking asyncio event loop."""
+
+    return await run_async(ApiConfig().max_concurrency, dataset, id)
+
+async def get_async(dataset = None, include_metadata = False, mnemonics = None, transform = None, separator = None, group_by = None, columns = None, layout = None, backend = 'pandas', **dim_values):
+    """Use this function to get data from Knoema dataset without blocking asyncio event loop.
+    Grouped results are returned as a list of frames."""
+
+    def get_data():
+        res = get(dataset, include_metadata, mnemonics, transform, separator, group_by, columns, layout, backend, **dim_values)
+        return list(res) if inspect.isgenerator(res) else res
+
+    return await run_async(ApiConfig().max_concurrency, get_data)
+
+async def search_async(query):
+    """Use this function to make search request without blocking asyncio event loop."""
+
+    return await run_async(ApiConfig().max_concurrency, search, query)
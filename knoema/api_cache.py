@@ -0,0 +1,158 @@
+"""This module contains cache of metadata loaded from Knoema API"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class MetadataCache(object):
+    """
+    The class keeps recently used metadata objects in memory.
+
+    max_size -- the maximum amount of entries, least recently used entries are evicted first. 0 disables the cache
+
+    ttl -- the amount of seconds an entry is valid after it is loaded, None means entries don't expire
+    """
+
+    def __init__(self, max_size=256, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """The method returns cached value or None if there is no valid entry for the key"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """The method stores value evicting least recently used entries over the size limit"""
+
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, load):
+        """The method returns cached value or loads and caches it"""
+
+        value = self.get(key)
+        if value is None:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, dataset=None):
+        """The method drops entries of given dataset or all entries if dataset is not specified"""
+
+        with self._lock:
+            if dataset is None:
+                self._entries.clear()
+                return
+
+            for key in [key for key in self._entries if key[1] == dataset]:
+                del self._entries[key]
+
+
+class PersistentMetadataCache(object):
+    """
+    The class keeps JSON of metadata in SQLite database, so it is shared by processes of the host
+    and survives restarts of them.
+
+    Entries are grouped by dataset. The dataset is considered valid during ttl seconds after it was checked,
+    after that its version (last update date) is checked and all entries of the dataset are dropped if it's changed.
+
+    directory -- the directory where the database file is kept, it is created if it doesn't exist
+
+    ttl -- the amount of seconds entries of a dataset are used without checking the version of the dataset
+    """
+
+    _file_name = 'knoema_metadata.sqlite'
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        self.path = os.path.join(directory, self._file_name)
+
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS datasets (id TEXT PRIMARY KEY, version TEXT, checked REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, dataset TEXT, data TEXT, stored REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_dataset ON entries (dataset)')
+
+    def _connect(self):
+        # the connection waits for locks of other processes instead of failing,
+        # not committed transaction is rolled back when the connection is closed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return contextlib.closing(conn)
+
+    def is_valid(self, dataset):
+        """The method checks whether entries of the dataset can be used without checking its version"""
+
+        with self._connect() as conn:
+            row = conn.execute('SELECT checked FROM datasets WHERE id = ?', (dataset,)).fetchone()
+        return row is not None and (self.ttl is None or time.time() - row[0] <= self.ttl)
+
+    def validate(self, dataset, version):
+        """The method marks the dataset as checked and drops its entries if the version is changed"""
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT version FROM datasets WHERE id = ?', (dataset,)).fetchone()
+            if row is None or row[0] != version:
+                conn.execute('DELETE FROM entries WHERE dataset = ?', (dataset,))
+            conn.execute('INSERT OR REPLACE INTO datasets (id, version, checked) VALUES (?, ?, ?)', (dataset, version, time.time()))
+            conn.execute('COMMIT')
+
+    def get(self, path):
+        """The method returns JSON stored for API path or None"""
+
+        with self._connect() as conn:
+            row = conn.execute('SELECT data FROM entries WHERE path = ?', (path,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, dataset, path, data):
+        """The method stores JSON loaded from API path of the dataset"""
+
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries (path, dataset, data, stored) VALUES (?, ?, ?, ?)',
+                         (path, dataset, json.dumps(data), time.time()))
+
+    def invalidate(self, dataset=None):
+        """The method drops entries of given dataset or all entries if dataset is not specified"""
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if dataset is None:
+                conn.execute('DELETE FROM entries')
+                conn.execute('DELETE FROM datasets')
+            else:
+                conn.execute('DELETE FROM entries WHERE dataset = ?', (dataset,))
+                conn.execute('DELETE FROM datasets WHERE id = ?', (dataset,))
+            conn.execute('COMMIT')
+
@@ -1,8 +1,8 @@
 """This module contains client that wrap requests and response to Knoema API"""
 
+import copy
 import json
 import urllib.parse
-import urllib.request
 import time
 import datetime
 import hmac
@@ -12,9 +12,17 @@ import random
 import string
 import io
 import os
+import gzip
+import codecs
+import queue
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 import knoema.api_definitions as definition
 import knoema.api_definitions_sema as definition_sema
 import knoema.api_definitions_search as definition_search
+from knoema.api_transport import ConnectionPool, RetryPolicy
+from knoema.api_cache import MetadataCache, PersistentMetadataCache
 from urllib.error import HTTPError
 
 def _random_string(length):
@@ -39,10 +47,258 @@ def _response_to_json(resp):
 
     return obj_resp
 
+def _get_dataset_version(data):
+    # DatasetMetadata changes given dictionary, so it gets a copy
+    meta = definition.DatasetMetadata(copy.deepcopy(data))
+    return '{}|{}'.format(meta.data.get('lastUpdatedOn'), meta.data.get('lastUpdate'))
+
+def _response_to_raw_data(resp):
+    stream = JsonArrayStream(resp, 'data')
+    series = list(stream)
+    data = dict(stream.fields)
+    data['data'] = series
+    return definition.RawDataResponse(data)
+
+class JsonArrayStream(object):
+    """The class decodes JSON object from response while it is read and yields items of one array field one by one.
+    Other fields of the object are available in fields, the fields following the array are filled once it is iterated"""
+
+    _whitespace = ' \t\n\r\ufeff'
+    _number_chars = '0123456789.eE+-'
+
+    def __init__(self, resp, array_name, chunk_size=64 * 1024):
+        self.fields = {}
+        self._resp = resp
+        self._array_name = array_name
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._iterated = False
+
+    def __iter__(self):
+        if self._iterated:
+            raise ValueError('The response stream can be iterated only once')
+        self._iterated = True
+
+        try:
+            yield from self._iter_object()
+            # read the rest of the body, so the connection can be reused
+            while self._read(self._chunk_size):
+                pass
+        finally:
+            self._resp.close()
+
+    def _iter_object(self):
+        if self._peek() != '{':
+            # api returns error message as json string
+            obj_resp = self._decode_value()
+            if isinstance(obj_resp, str):
+                raise ValueError(obj_resp)
+            raise ValueError('Unexpected response from server: {}'.format(obj_resp))
+
+        self._pos += 1
+        if self._peek() == '}':
+            return
+
+        while True:
+            key = self._decode_value()
+            self._expect(':')
+            if key == self._array_name and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._decode_value()
+                        if self._expect(',]') == ']':
+                            break
+                self.fields[key] = None
+            else:
+                self.fields[key] = self._decode_value()
+
+            if self._expect(',}') == '}':
+                return
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._whitespace:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read(self._chunk_size):
+                raise ValueError('Unexpected end of response from server')
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError('Unexpected symbol {} in response from server'.format(char))
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # a number can be cut by the end of the chunk, so value is taken only if it is followed by other symbol
+                if end < len(self._buffer) and self._buffer[end] not in self._number_chars or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # the value is decoded from its beginning again, so read at least as much as is buffered to keep it linear
+            self._read(max(self._chunk_size, len(self._buffer) - self._pos))
+
+    def _read(self, size):
+        if self._eof:
+            return False
+
+        # drop already decoded part, so only current value is kept in memory
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+
+        chunk = self._resp.read(size)
+        if chunk:
+            self._buffer += self._text_decoder.decode(chunk)
+        else:
+            self._buffer += self._text_decoder.decode(b'', True)
+            self._eof = True
+        return True
+
+class RawDataPager(object):
+    """
+    The class iterates pages of raw data response.
+
+    Next page is requested in background as soon as its continuation token is decoded,
+    while current page is still being decoded or processed by consumer. lookahead limits
+    the amount of pages which are loaded ahead of consumer.
+
+    If loading of a page fails, it is loaded again from its continuation token according
+    to retry policy, so already loaded pages are not requested once more.
+    """
+
+    def __init__(self, first_response, next_response, lookahead=2, retry=None, first_method='POST'):
+        self._first_response = first_response
+        self._next_response = next_response
+        self.lookahead = max(lookahead, 1)
+        self.retry = retry if retry is not None else RetryPolicy(total=0)
+        self._first_method = first_method
+
+    def __iter__(self):
+        slots = threading.Semaphore(self.lookahead)
+        stopped = threading.Event()
+        pages = queue.Queue()
+        executor = ThreadPoolExecutor(self.lookahead, thread_name_prefix='knoema-pager')
+
+        def submit(get_response, method='GET'):
+            pages.put(executor.submit(load, get_response, method))
+
+        def load(get_response, method):
+            next_submitted = False
+            attempt = 0
+            while True:
+                stream = JsonArrayStream(get_response(), 'data')
+                series = []
+                try:
+                    for item in stream:
+                        if stopped.is_set():
+                            return None, True
+                        series.append(item)
+                        # the next page is requested as soon as token is known, unless consumer is behind by lookahead pages
+                        if not next_submitted and stream.fields.get('continuationToken') is not None and slots.acquire(False):
+                            token = stream.fields['continuationToken']
+                            submit(lambda token=token: self._next_response(token))
+                            next_submitted = True
+                    break
+                except (OSError, http.client.HTTPException) as err:
+                    # the connection is broken while the page is read, so the page is requested again
+                    if not self.retry.is_retryable(method, err, attempt):
+                        raise
+                    time.sleep(self.retry.get_backoff(attempt, err))
+                    attempt += 1
+
+            data = dict(stream.fields)
+            data['data'] = series
+            return definition.RawDataResponse(data), next_submitted
+
+        try:
+            slots.acquire()
+            submit(self._first_response, self._first_method)
+            while True:
+                page, next_submitted = pages.get().result()
+                slots.release()
+                token = page.continuation_token
+                if token is not None and not next_submitted:
+                    slots.acquire()
+                    submit(lambda token=token: self._next_response(token))
+                yield page
+                if token is None:
+                    break
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_series(self):
+        """
+        The method yields pairs of fields of the page and series of all pages one by one while pages are decoded,
+        so only one series is kept in memory. Fields following the array of series are filled once the page is decoded.
+
+        Response of next page is requested in background as soon as its continuation token is decoded.
+        If reading of a page fails, the page is loaded again and its series already yielded are skipped.
+        """
+        executor = ThreadPoolExecutor(1, thread_name_prefix='knoema-pager')
+        next_response = None
+        get_response = self._first_response
+        method = self._first_method
+        try:
+            while get_response is not None:
+                prefetched, next_response = next_response, None
+                fields = {}
+                yielded = 0
+                attempt = 0
+                while True:
+                    try:
+                        if prefetched is not None:
+                            future, prefetched = prefetched, None
+                            resp = future.result()
+                        else:
+                            resp = get_response()
+                        stream = JsonArrayStream(resp, 'data')
+                        # fields of the page are kept in one dictionary when the page is loaded again
+                        fields.clear()
+                        stream.fields = fields
+                        decoded = 0
+                        for item in stream:
+                            if next_response is None and fields.get('continuationToken') is not None:
+                                next_response = executor.submit(self._next_response, fields['continuationToken'])
+                            decoded += 1
+                            if decoded > yielded:
+                                yielded += 1
+                                yield fields, item
+                        break
+                    except (OSError, http.client.HTTPException) as err:
+                        if not self.retry.is_retryable(method, err, attempt):
+                            raise
+                        time.sleep(self.retry.get_backoff(attempt, err))
+                        attempt += 1
+
+                token = fields.get('continuationToken')
+                get_response = (lambda token=token: self._next_response(token)) if token is not None else None
+                method = 'GET'
+        finally:
+            if next_response is not None:
+                next_response.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
 class ApiClient:
     """This is client that wrap requests and response to Knoema API"""
 
-    def __init__(self, host, appid=None, appsecret=None):
+    def __init__(self, host, appid=None, appsecret=None, pool_size=10, pool_idle_timeout=60, request_compression_threshold=None, retry=None,
+                 metadata_cache_size=256, metadata_cache_ttl=300, persistent_cache_dir=None, persistent_cache_ttl=3600, max_concurrency=10):
         splitted = urllib.parse.urlsplit(host)
         self._host = splitted.netloc.strip()
         if not self._host:
@@ -53,10 +309,25 @@ class ApiClient:
 
         self._appid = appid
         self._appsecret = appsecret
-        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor)
+        self._retry = retry if retry is not None else RetryPolicy()
+        self._transport = ConnectionPool(pool_size, pool_idle_timeout, self._retry)
+        self._request_compression_threshold = request_compression_threshold
+        self._max_concurrency = max_concurrency
+        self.metadata_cache = MetadataCache(metadata_cache_size, metadata_cache_ttl)
+        self.persistent_cache = None
+        if persistent_cache_dir:
+            # metadata of different hosts and credentials is kept in separate databases,
+            # so metadata of private datasets is not read by other users of the directory
+            cache_dir = os.path.join(persistent_cache_dir, self._host.replace(':', '_'), self._get_credentials_hash())
+            self.persistent_cache = PersistentMetadataCache(cache_dir, persistent_cache_ttl)
 
         self._search_config = None
 
+    def _get_credentials_hash(self):
+        if not self._appid or not self._appsecret:
+            return 'anonymous'
+        return hashlib.sha256('{}:{}'.format(self._appid, self._appsecret).encode()).hexdigest()[:16]
+
     def _get_url(self, apipath):
         return urllib.parse.urlunsplit((self._schema, self._host, apipath, '', ''))
 
@@ -65,7 +336,8 @@ class ApiClient:
         if not self._appid or not self._appsecret:
             return {
                 'Content-Type' : 'application/json',
-                'Accept': 'application/json'
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate'
                 }
 
         key = datetime.datetime.utcnow().strftime('%d-%m-%y-%H').encode()
@@ -76,19 +348,54 @@ class ApiClient:
         return {
             'Content-Type' : 'application/json',
             'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
             'Authorization' : auth
             }
 
-    def _api_get(self, obj, apipath, query=None):
+    def _api_get_response(self, apipath, query=None, read=None):
 
         url = self._get_url(apipath)
         if query:
             url = '{}?{}'.format(url, query)
 
         headers = self._get_request_headers()
-        req = urllib.request.Request(url, headers=headers)
-        resp = self._opener.open(req)
-        return obj(_response_to_json(resp))
+        return self._transport.request('GET', url, headers=headers, read=read)
+
+    def _api_get_json(self, apipath, query=None):
+        # the body is decoded inside of the retried call, so the request is repeated if the connection breaks while it is read
+        return self._api_get_response(apipath, query, _response_to_json)
+
+    def _api_get(self, obj, apipath, query=None):
+
+        return obj(self._api_get_json(apipath, query))
+
+    def _api_get_metadata(self, obj, dataset, apipath):
+
+        if self.persistent_cache is None:
+            return self._api_get(obj, apipath)
+
+        cache = self.persistent_cache
+        dataset_path = '/api/1.0/meta/dataset/{}'.format(dataset)
+        if not cache.is_valid(dataset):
+            data = self._api_get_json(dataset_path)
+            cache.validate(dataset, _get_dataset_version(data))
+            cache.put(dataset, dataset_path, data)
+            if apipath == dataset_path:
+                return obj(data)
+
+        data = cache.get(apipath)
+        if data is None:
+            data = self._api_get_json(apipath)
+            cache.put(dataset, apipath, data)
+        return obj(data)
+
+    def _load_concurrently(self, func, args_list):
+        # results are returned in order of arguments, the first error is raised
+        if len(args_list) <= 1 or self._max_concurrency <= 1:
+            return [func(*args) for args in args_list]
+
+        with ThreadPoolExecutor(min(self._max_concurrency, len(args_list)), thread_name_prefix='knoema') as executor:
+            return list(executor.map(lambda args: func(*args), args_list))
 
     def _api_post(self, responseobj, apipath, requestobj):
 
@@ -96,41 +403,74 @@ class ApiClient:
         
         return self._api_post_json(responseobj, apipath, json_data)
 
-    def _api_post_json(self, responseobj, apipath, requestjson):
+    def _api_post_json_response(self, apipath, requestjson):
 
         url = self._get_url(apipath)
 
         binary_data = requestjson.encode()
 
         headers = self._get_request_headers()
-        req = urllib.request.Request(url, binary_data, headers)
-        resp = self._opener.open(req)
+        if self._request_compression_threshold is not None and len(binary_data) >= self._request_compression_threshold:
+            binary_data = gzip.compress(binary_data)
+            headers['Content-Encoding'] = 'gzip'
+
+        return self._transport.request('POST', url, binary_data, headers)
+
+    def _api_post_json(self, responseobj, apipath, requestjson):
+
+        resp = self._api_post_json_response(apipath, requestjson)
         return responseobj(_response_to_json(resp))
 
     def check_correct_host(self):
         pass 
 
+    def close(self):
+        """The method closes idle connections kept by the client"""
+        self._transport.close()
+
+    def invalidate_metadata(self, dataset=None):
+        """The method drops cached metadata of given dataset or of all datasets"""
+        self.metadata_cache.invalidate(dataset)
+        if self.persistent_cache is not None:
+            self.persistent_cache.invalidate(dataset)
+
     def get_dataset(self, datasetid):
         """The method is getting information about dataset byt it's id"""
 
         path = '/api/1.0/meta/dataset/{}'
-        return self._api_get(definition.Dataset, path.format(datasetid))
+        return self.metadata_cache.get_or_load(('dataset', datasetid),
+            lambda: self._api_get_metadata(definition.Dataset, datasetid, path.format(datasetid)))
 
     def get_dataset_meta(self, datasetid):
         path = '/api/1.0/meta/dataset/{}'
-        return self._api_get(definition.DatasetMetadata, path.format(datasetid))
+        return self.metadata_cache.get_or_load(('dataset_meta', datasetid),
+            lambda: self._api_get_metadata(definition.DatasetMetadata, datasetid, path.format(datasetid)))
 
     def get_dimension(self, dataset, dimension):
         """The method is getting information about dimension with items"""
 
         path = '/api/1.0/meta/dataset/{}/dimension/{}'
-        return self._api_get(definition.Dimension, path.format(dataset, dimension))
+        return self.metadata_cache.get_or_load(('dimension', dataset, dimension),
+            lambda: self._api_get_metadata(definition.Dimension, dataset, path.format(dataset, dimension)))
+
+    def get_datasets(self, datasetids):
+        """The method is getting information about several datasets concurrently keeping their order"""
+        return self._load_concurrently(self.get_dataset, [(datasetid,) for datasetid in datasetids])
+
+    def get_dimensions(self, dataset, dimensions):
+        """The method is getting information about several dimensions of dataset concurrently keeping their order"""
+        return self._load_concurrently(self.get_dimension, [(dataset, dimension) for dimension in dimensions])
+
+    def get_datasets_dimensions(self, dataset_dimensions):
+        """The method is getting information about dimensions given by pairs of dataset and dimension concurrently keeping their order"""
+        return self._load_concurrently(self.get_dimension, list(dataset_dimensions))
 
     def get_daterange(self, dataset):
         """The method is getting information about date range of dataset"""
 
         path = '/api/1.0/meta/dataset/{}/daterange'
-        return self._api_get(definition.DateRange, path.format(dataset))
+        return self.metadata_cache.get_or_load(('daterange', dataset),
+            lambda: self._api_get_metadata(definition.DateRange, dataset, path.format(dataset)))
 
     def get_data(self, pivotrequest):
         """The method is getting data by pivot request"""
@@ -156,18 +496,46 @@ class ApiClient:
 
     def get_data_raw(self, request, metadata_only = False):
         """The method is getting data by raw request"""
-        path = '/api/1.2/data/raw/' + ('?metadataOnly=true' if metadata_only else '')
-        res = self._api_post(definition.RawDataResponse, path, request)
-        token = res.continuation_token
-        while token is not None:
-           res2 = self.get_data_raw_with_token(token, metadata_only)
-           res.series += res2.series
-           token = res2.continuation_token 
+        res = None
+        for page in self.iter_data_raw_pages(request, metadata_only):
+            if res is None:
+                res = page
+            else:
+                res.series += page.series
         return res
 
     def get_data_raw_with_token(self, token, metadata_only = False):
-        path = '/api/1.0/data/raw/?continuationToken={0}' + ('&metadataOnly=true' if metadata_only else '')
-        return self._api_get(definition.RawDataResponse, path.format(token))
+        return _response_to_raw_data(self._get_raw_page_loader(metadata_only)(token))
+
+    def iter_data_raw(self, request, metadata_only = False):
+        """The method yields series of raw request across all pages one by one, so only one series is kept in memory"""
+        for _, series in self.iter_data_raw_pages(request, metadata_only).iter_series():
+            yield series
+
+    def iter_data_raw_with_token(self, token, metadata_only = False):
+        """The method yields series of raw data starting from given continuation token one by one"""
+        for _, series in self.iter_data_raw_pages_with_token(token, metadata_only).iter_series():
+            yield series
+
+    def iter_data_raw_pages(self, request, metadata_only = False, lookahead = 2):
+        """The method yields pages of raw request, next pages are requested in background"""
+        path = self._get_raw_data_path(None, metadata_only)
+        first_response = lambda: self._api_post_json_response(path, request.save_to_json())
+        return RawDataPager(first_response, self._get_raw_page_loader(metadata_only), lookahead, self._retry)
+
+    def iter_data_raw_pages_with_token(self, token, metadata_only = False, lookahead = 2):
+        """The method yields pages of raw data starting from given continuation token"""
+        load_page = self._get_raw_page_loader(metadata_only)
+        return RawDataPager(lambda: load_page(token), load_page, lookahead, self._retry, 'GET')
+
+    def _get_raw_page_loader(self, metadata_only):
+        return lambda token: self._api_get_response(self._get_raw_data_path(token, metadata_only))
+
+    def _get_raw_data_path(self, token, metadata_only):
+        # the first page is requested by posted request, next pages are requested by continuation token
+        if token is None:
+            return '/api/1.2/data/raw/' + ('?metadataOnly=true' if metadata_only else '')
+        return '/api/1.0/data/raw/?continuationToken={0}'.format(token) + ('&metadataOnly=true' if metadata_only else '')
 
     def get_mnemonics(self, mnemonics, transform, frequency):
         """The method get series by mnemonics"""
@@ -194,22 +562,15 @@ class ApiClient:
         url = self._get_url(path)
 
         headers = self._get_request_headers()
-        req = urllib.request.Request(url, headers=headers)
-        resp = self._opener.open(req)
-        return _response_to_json(resp)
+        return self._transport.request('GET', url, headers=headers, read=_response_to_json)
 
     def search(self, query):
         if self._search_config == None:
             path = '/api/1.0/search/config'
             self._search_config = self._api_get(definition_search.SearchConfig, path)
 
-        headers = self._get_request_headers()
         url = self._search_config.build_search_url(query)
-        req = urllib.request.Request(url, headers=headers)
-        req = urllib.request.Request(url)
-        resp = self._opener.open(req)
-
-        return definition_search.SearchResultsInt(_response_to_json(resp))
+        return definition_search.SearchResultsInt(self._transport.request('GET', url, read=_response_to_json))
 
     def upload_file(self, file):
         """The method is posting file to the remote server"""
@@ -220,10 +581,8 @@ class ApiClient:
         binary_data = fcontent.get_binary()
 
         headers = self._get_request_headers()
-        req = urllib.request.Request(url, binary_data, headers)
-        req.add_header('Content-type', fcontent.get_content_type())
-        req.add_header('Content-length', len(binary_data))
-        resp = urllib.request.urlopen(req)   
+        headers['Content-Type'] = fcontent.get_content_type()
+        resp = self._transport.request('POST', url, binary_data, headers)
 
         return definition.UploadPostResponse(_response_to_json(resp))
 
@@ -287,6 +646,7 @@ class ApiClient:
             msg = '{}, because of the following error(s): {}'.format(err_msg, ver_err)
             raise ValueError(msg)
 
+        self.invalidate_metadata(ds_upload_result.dataset)
         return ds_upload_result.dataset
 
     def delete(self, dataset):
@@ -298,13 +658,14 @@ class ApiClient:
         binary_data = json_data.encode()
 
         headers = self._get_request_headers()
-        req = urllib.request.Request(url, binary_data, headers)
-        resp = urllib.request.urlopen(req)   
+        resp = self._transport.request('POST', url, binary_data, headers)
         str_response = resp.read().decode('utf-8')
         if str_response != '"successful"' or resp.status < 200 or resp.status >= 300:
             msg = 'Dataset has not been deleted, because of the following error(s): {}'.format(str_response)
             raise ValueError(msg)
 
+        self.invalidate_metadata(dataset)
+
     def verify(self, dataset, publication_date, source, refernce_url):
         """The method is verifying dataset by it's id"""
 
@@ -316,6 +677,8 @@ class ApiClient:
             msg = 'Dataset has not been verified, because of the following error(s): {}'.format(ver_err)
             raise ValueError(msg)
 
+        self.invalidate_metadata(dataset)
+
 
 class FileContent(object):
     """Accumulate the data to be used when posting a form."""
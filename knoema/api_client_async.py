@@ -0,0 +1,132 @@
+"""This module contains asyncio client that wrap requests and response to Knoema API"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from knoema.api_config import ApiConfig
+
+_shared_executors = {}
+_shared_executors_lock = threading.Lock()
+
+def _get_shared_executor(max_concurrency):
+    """The function returns the long-lived pool of max_concurrency worker threads shared by all callers with this bound"""
+
+    with _shared_executors_lock:
+        executor = _shared_executors.get(max_concurrency)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix='knoema')
+            _shared_executors[max_concurrency] = executor
+        return executor
+
+def run_async(max_concurrency, func, *args, **kwargs):
+    """The function runs blocking function on the shared pool of worker threads and returns awaitable result"""
+
+    # pools are kept for the life of the process, so work already queued on a pool stays bounded by its size
+    executor = _get_shared_executor(max_concurrency)
+
+    # the function is run in the current context, so it uses clients of the current knoema.session()
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+class AsyncApiClient(object):
+    """
+    This is asyncio client that wrap requests and response to Knoema API.
+
+    Requests are sent by given ApiClient, so authorization, request headers and keep-alive
+    connections are shared with it. Every request runs on the pool of worker threads which run_async
+    shares between all callers with the same max_concurrency (ApiConfig().max_concurrency by default),
+    so the event loop is not blocked and amount of simultaneous requests of these callers is bounded by it.
+    """
+
+    def __init__(self, client, max_concurrency=None):
+        self.client = client
+        self.max_concurrency = max_concurrency if max_concurrency is not None else ApiConfig().max_concurrency
+
+    async def _call(self, func, *args, **kwargs):
+        return await run_async(self.max_concurrency, func, *args, **kwargs)
+
+    async def get_dataset(self, datasetid):
+        """The method is getting information about dataset byt it's id"""
+        return await self._call(self.client.get_dataset, datasetid)
+
+    async def get_dataset_meta(self, datasetid):
+        return await self._call(self.client.get_dataset_meta, datasetid)
+
+    async def get_dimension(self, dataset, dimension):
+        """The method is getting information about dimension with items"""
+        return await self._call(self.client.get_dimension, dataset, dimension)
+
+    async def get_daterange(self, dataset):
+        """The method is getting information about date range of dataset"""
+        return await self._call(self.client.get_daterange, dataset)
+
+    async def get_data(self, pivotrequest):
+        """The method is getting data by pivot request"""
+        return await self._call(self.client.get_data, pivotrequest)
+
+    async def get_dataset_data(self, dataset_id, filters):
+        """The method is getting data of dataset by filters"""
+        return await self._call(self.client.get_dataset_data, dataset_id, filters)
+
+    async def get_data_raw(self, request, metadata_only = False):
+        """The method is getting data by raw request"""
+        return await self._call(self.client.get_data_raw, request, metadata_only)
+
+    async def get_data_raw_with_token(self, token, metadata_only = False):
+        return await self._call(self.client.get_data_raw_with_token, token, metadata_only)
+
+    async def get_mnemonics(self, mnemonics, transform, frequency):
+        """The method get series by mnemonics"""
+        return await self._call(self.client.get_mnemonics, mnemonics, transform, frequency)
+
+    async def get_details(self, request):
+        """The method is getting data details by request"""
+        return await self._call(self.client.get_details, request)
+
+    async def get_company_info(self, ticker):
+        """The method get company data"""
+        return await self._call(self.client.get_company_info, ticker)
+
+    async def search(self, query):
+        return await self._call(self.client.search, query)
+
+    async def upload_file(self, file):
+        """The method is posting file to the remote server"""
+        return await self._call(self.client.upload_file, file)
+
+    async def upload_verify(self, file_location, dataset=None):
+        """This method is verifiing posted file on server"""
+        return await self._call(self.client.upload_verify, file_location, dataset)
+
+    async def upload_submit(self, upload_request):
+        """The method is submitting dataset upload"""
+        return await self._call(self.client.upload_submit, upload_request)
+
+    async def upload_status(self, upload_id):
+        """The method is checking status of uploaded dataset"""
+        return await self._call(self.client.upload_status, upload_id)
+
+    async def upload(self, file_path, dataset=None, public=False, name = None):
+        """Use this function to upload data to Knoema dataset."""
+        return await self._call(self.client.upload, file_path, dataset, public, name)
+
+    async def delete(self, dataset):
+        """The method is deleting dataset by it's id"""
+        return await self._call(self.client.delete, dataset)
+
+    async def verify(self, dataset, publication_date, source, refernce_url):
+        """The method is verifying dataset by it's id"""
+        return await self._call(self.client.verify, dataset, publication_date, source, refernce_url)
+
+    def close(self):
+        """The method closes idle connections of the client, worker threads are shared and kept"""
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,6 +1,7 @@
 """This module contains Api configuration class"""
 
 import os
+from knoema.api_transport import RetryPolicy
 
 class ApiConfig(object):
     """
@@ -15,6 +16,29 @@ class ApiConfig(object):
 
     app_secret -- code that can be done after application will be created.
     Should be set up together with app_id
+
+    pool_size -- the maximum amount of idle keep-alive connections kept for one host
+
+    pool_idle_timeout -- the amount of seconds after which an idle connection is closed
+
+    request_compression_threshold -- the size in bytes starting from which request bodies
+    (e.g. pivot requests with many members) are sent gzip compressed. None disables compression
+
+    max_concurrency -- the maximum amount of requests running at the same time for async functions
+    and for metadata loaded concurrently (e.g. dimensions of dataset)
+
+    max_chunks_in_flight -- the maximum amount of parts of grouped data (group_by) or of flat datasets loaded by knoema.iter_get
+    loaded concurrently or kept ahead of processing, it limits both the load on the server and the memory. 1 loads parts one after another
+
+    retry -- RetryPolicy which describes how failed requests are repeated
+
+    metadata_cache_size -- the maximum amount of datasets, dimensions and date ranges kept in memory. 0 disables the cache
+
+    metadata_cache_ttl -- the amount of seconds cached metadata is reused. None means it is kept until evicted
+
+    persistent_cache_dir -- the directory where metadata is cached on disk and shared between processes. None disables the cache
+
+    persistent_cache_ttl -- the amount of seconds metadata cached on disk is used before the last update date of its dataset is checked
     """
 
     def __new__(cls):
@@ -23,9 +47,29 @@ class ApiConfig(object):
             cls.instance.host = os.environ['KNOEMA_HOST'] if 'KNOEMA_HOST' in os.environ else 'knoema.com'
             cls.instance.app_id = None
             cls.instance.app_secret = None
+            cls.instance.pool_size = 10
+            cls.instance.pool_idle_timeout = 60
+            cls.instance.request_compression_threshold = None
+            cls.instance.max_concurrency = 10
+            cls.instance.max_chunks_in_flight = 4
+            cls.instance.retry = RetryPolicy()
+            cls.instance.metadata_cache_size = 256
+            cls.instance.metadata_cache_ttl = 300
+            cls.instance.persistent_cache_dir = os.environ['KNOEMA_CACHE_DIR'] if 'KNOEMA_CACHE_DIR' in os.environ else None
+            cls.instance.persistent_cache_ttl = 3600
         return cls.instance
 
     def __init__(self):
         self.host = self.instance.host
         self.app_id = self.instance.app_id
         self.app_secret = self.instance.app_secret
+        self.pool_size = self.instance.pool_size
+        self.pool_idle_timeout = self.instance.pool_idle_timeout
+        self.request_compression_threshold = self.instance.request_compression_threshold
+        self.max_concurrency = self.instance.max_concurrency
+        self.max_chunks_in_flight = self.instance.max_chunks_in_flight
+        self.retry = self.instance.retry
+        self.metadata_cache_size = self.instance.metadata_cache_size
+        self.metadata_cache_ttl = self.instance.metadata_cache_ttl
+        self.persistent_cache_dir = self.instance.persistent_cache_dir
+        self.persistent_cache_ttl = self.instance.persistent_cache_ttl
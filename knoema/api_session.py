@@ -0,0 +1,96 @@
+"""This module contains registry of Knoema API clients shared between calls"""
+
+import contextlib
+import contextvars
+import hashlib
+import os
+import threading
+from knoema.api_client import ApiClient
+
+class ClientRegistry(object):
+    """
+    The class keeps one ApiClient per host, application id and credentials, so module-level functions share
+    connections and loaded metadata. When connection settings of the configuration change, the client is
+    replaced by a new one and closed. The registry is thread-safe.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _get_key(self, config):
+        # the key is the pair of the account and settings, policies of retries are compared by values,
+        # so equal configurations created again share the client
+        secret_hash = hashlib.sha256(config.app_secret.encode()).hexdigest() if config.app_secret else None
+        retry = config.retry
+        retry_options = None if retry is None else (type(retry), retry.total, retry.backoff_factor, retry.max_backoff,
+                                                    tuple(retry.status_forcelist), tuple(retry.allowed_methods))
+        options = (config.pool_size, config.pool_idle_timeout, config.request_compression_threshold, retry_options,
+                   config.metadata_cache_size, config.metadata_cache_ttl, config.persistent_cache_dir, config.persistent_cache_ttl,
+                   config.max_concurrency)
+        return (config.host, config.app_id, secret_hash), options
+
+    def get_client(self, config):
+        """The method returns client for given configuration creating it at first call or when settings are changed"""
+
+        account, options = self._get_key(config)
+        replaced = None
+        with self._lock:
+            # connections can't be shared with forked process
+            if self._pid != os.getpid():
+                self._clients = {}
+                self._pid = os.getpid()
+
+            entry = self._clients.get(account)
+            if entry is not None and entry[0] == options:
+                return entry[1]
+
+            client = ApiClient(config.host, config.app_id, config.app_secret, config.pool_size, config.pool_idle_timeout,
+                               config.request_compression_threshold, config.retry,
+                               config.metadata_cache_size, config.metadata_cache_ttl,
+                               config.persistent_cache_dir, config.persistent_cache_ttl, config.max_concurrency)
+            self._clients[account] = (options, client)
+            if entry is not None:
+                replaced = entry[1]
+
+        # idle connections of the replaced client are closed, requests which still use it open new ones
+        if replaced is not None:
+            replaced.close()
+        return client
+
+    def close(self):
+        """The method closes all clients of the registry"""
+
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for _, client in clients.values():
+            client.close()
+
+
+_process_registry = ClientRegistry()
+_session_registry = contextvars.ContextVar('knoema_session_registry', default=None)
+
+def get_registry():
+    """The function returns registry of current session or process-wide registry outside of sessions"""
+
+    registry = _session_registry.get()
+    return registry if registry is not None else _process_registry
+
+@contextlib.contextmanager
+def session():
+    """
+    The function creates scope where module-level functions share their own clients.
+    The clients are closed on exit from the scope.
+
+    The scope is kept in context variable, so it is visible for asyncio tasks started inside it.
+    Threads started inside it use process-wide registry unless they run in copied context.
+    """
+
+    registry = ClientRegistry()
+    token = _session_registry.set(registry)
+    try:
+        yield registry
+    finally:
+        _session_registry.reset(token)
+        registry.close()
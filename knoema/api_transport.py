@@ -0,0 +1,382 @@
+"""This module contains pooled HTTP transport used by Knoema API client"""
+
+import base64
+import email.utils
+import http.client
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from urllib.error import HTTPError, URLError
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 10
+_USER_AGENT = 'Python-urllib/{}'.format(urllib.request.__version__)
+_CHUNK_SIZE = 64 * 1024
+
+class _Decompressor(object):
+    """The class decompresses gzip or deflate content chunk by chunk"""
+
+    def __init__(self, encoding):
+        self._encoding = encoding
+        # gzip and zlib wrapped content are detected by header, raw deflate is handled as fallback
+        self._decompressobj = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        self._first_chunk = True
+
+    def decompress(self, data):
+        if not self._first_chunk or self._encoding != 'deflate':
+            return self._decompressobj.decompress(data)
+
+        self._first_chunk = False
+        try:
+            return self._decompressobj.decompress(data)
+        except zlib.error:
+            self._decompressobj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressobj.decompress(data)
+
+    def flush(self):
+        return self._decompressobj.flush()
+
+
+class PooledResponse(object):
+    """The class wraps HTTP response and returns its connection to the pool once the body is read.
+    Compressed content is decompressed transparently while it is read"""
+
+    def __init__(self, pool, key, conn, resp, url):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+        encoding = (resp.headers.get('Content-Encoding') or '').strip().lower()
+        self._decompressor = _Decompressor(encoding) if encoding in ('gzip', 'x-gzip', 'deflate') else None
+        self._buffer = b''
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def read(self, amt=None):
+        if self._decompressor is None:
+            data = self._read_raw(amt)
+            if self._resp.isclosed():
+                self._release()
+            return data
+
+        if amt is None:
+            data = self._buffer + self._decompress(self._read_raw(None))
+            self._buffer = b''
+            return data
+
+        while len(self._buffer) < amt and self._conn is not None:
+            self._buffer += self._decompress(self._read_raw(_CHUNK_SIZE))
+
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def _read_raw(self, amt):
+        if amt is None:
+            return self._resp.read()
+
+        data = self._resp.read(amt)
+        # http.client doesn't report that connection is closed before the whole body is received
+        if not data and amt and self._resp.length:
+            raise http.client.IncompleteRead(b'', self._resp.length)
+        return data
+
+    def _decompress(self, data):
+        data = self._decompressor.decompress(data)
+        if self._resp.isclosed():
+            data += self._decompressor.flush()
+            self._release()
+        return data
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._resp.isclosed():
+            self._release()
+            return
+
+        # the body was not read till the end, so the connection can't be reused
+        self._resp.close()
+        self._conn.close()
+        self._conn = None
+
+    def _release(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._put(self._key, conn, not self._resp.will_close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RetryPolicy(object):
+    """
+    The class describes which failed requests are repeated and how long to wait before it.
+
+    total -- the maximum amount of retries for one request, 0 disables retries
+
+    backoff_factor -- the delay before n-th retry is random value (jitter) between 0 and backoff_factor * 2 ** (n - 1) seconds
+
+    max_backoff -- the maximum delay in seconds between retries
+
+    status_forcelist -- HTTP statuses of responses which are retried
+
+    allowed_methods -- HTTP methods which are retried, only idempotent methods by default
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=60,
+                 status_forcelist=(429, 500, 502, 503, 504),
+                 allowed_methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = status_forcelist
+        self.allowed_methods = [method.upper() for method in allowed_methods]
+
+    def is_retryable(self, method, error, attempt):
+        """The method checks if request failed with given error can be repeated after given amount of retries"""
+
+        if attempt >= self.total:
+            return False
+
+        if isinstance(error, HTTPError):
+            if error.code not in self.status_forcelist:
+                return False
+            # the server rejects such request before processing it, so it is safe to repeat any request
+            if error.code == 429:
+                return True
+        elif not isinstance(error, (OSError, http.client.HTTPException)):
+            return False
+
+        return method.upper() in self.allowed_methods
+
+    def get_backoff(self, attempt, error=None):
+        """The method returns amount of seconds to wait before the retry"""
+
+        retry_after = self._get_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def _get_retry_after(self, error):
+        if not isinstance(error, HTTPError) or error.code not in (429, 503) or error.headers is None:
+            return None
+
+        value = error.headers.get('Retry-After')
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0, date.timestamp() - time.time())
+
+    def call(self, method, func):
+        """The method calls func and repeats the call while it fails with retryable error"""
+
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except (OSError, http.client.HTTPException) as err:
+                if not self.is_retryable(method, err, attempt):
+                    raise
+                if isinstance(err, HTTPError):
+                    err.close()
+                delay = self.get_backoff(attempt, err)
+
+            time.sleep(delay)
+            attempt += 1
+
+
+class ConnectionPool(object):
+    """
+    The class keeps HTTP/1.1 keep-alive connections and reuses them per host.
+
+    pool_size -- the maximum amount of idle connections kept for one host
+
+    idle_timeout -- the amount of seconds after which an idle connection is dropped
+
+    retry -- RetryPolicy used for failed requests, None disables retries
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=60, retry=None):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.retry = retry if retry is not None else RetryPolicy(total=0)
+        self.cookies = http.cookiejar.CookieJar()
+        self._proxies = urllib.request.getproxies()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None, read=None):
+        """The method sends request following redirects and raises HTTPError for error responses.
+        Failed requests are repeated according to retry policy.
+
+        If read is given, the response is passed to it and its result is returned. The body is read inside
+        of the repeated call, so the request is repeated also when the connection breaks while the body is read"""
+
+        if read is None:
+            return self.retry.call(method, lambda: self._request(method, url, body, headers))
+
+        def request_and_read():
+            resp = self._request(method, url, body, headers)
+            try:
+                return read(resp)
+            finally:
+                resp.close()
+
+        return self.retry.call(method, request_and_read)
+
+    def _request(self, method, url, body, headers):
+        headers = dict(headers) if headers else {}
+        for _ in range(_MAX_REDIRECTS + 1):
+            req = urllib.request.Request(url, body, headers, method=method)
+            self.cookies.add_cookie_header(req)
+            resp = self._send(req)
+            self.cookies.extract_cookies(resp, req)
+
+            location = resp.headers.get('Location')
+            if resp.status not in _REDIRECT_CODES or not location:
+                break
+
+            resp.read()
+            url = urllib.parse.urljoin(url, location)
+            if resp.status in (301, 302, 303) and method not in ('GET', 'HEAD'):
+                # the same way as urllib does, the body is not resent after such redirect
+                method = 'GET'
+                body = None
+                headers = {k: v for k, v in headers.items() if k.lower() not in ('content-type', 'content-length')}
+
+        if resp.status >= 300:
+            raise HTTPError(resp.url, resp.status, resp.reason, resp.headers, resp)
+
+        return resp
+
+    def close(self):
+        """The method closes all idle connections"""
+
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+    def _send(self, req):
+        split = urllib.parse.urlsplit(req.full_url)
+        key = (split.scheme, split.netloc)
+        headers = dict(req.header_items())
+        headers.setdefault('User-agent', _USER_AGENT)
+
+        while True:
+            conn, reused = self._get(key)
+            path = self._get_request_path(conn, split)
+            try:
+                conn.request(req.get_method(), path, req.data, headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as err:
+                conn.close()
+                # the server may drop keep-alive connection while it is idle, so try again with new one
+                if reused:
+                    continue
+                raise URLError(err)
+            except OSError as err:
+                conn.close()
+                raise URLError(err)
+
+            return PooledResponse(self, key, conn, resp, req.full_url)
+
+    def _get_request_path(self, conn, split):
+        if isinstance(conn, _HTTPProxyConnection):
+            return urllib.parse.urlunsplit(split[:4] + ('',))
+        return urllib.parse.urlunsplit(('', '', split.path or '/', split.query, ''))
+
+    def _get(self, key):
+        now = time.monotonic()
+        expired = []
+        conn = None
+        with self._lock:
+            connections = self._idle.get(key)
+            while connections:
+                candidate, released_at = connections.pop()
+                if self.idle_timeout is not None and now - released_at > self.idle_timeout:
+                    expired.append(candidate)
+                    continue
+                conn = candidate
+                break
+
+        for candidate in expired:
+            candidate.close()
+
+        if conn is not None:
+            return conn, True
+
+        return self._new_connection(key), False
+
+    def _put(self, key, conn, reusable):
+        if reusable:
+            with self._lock:
+                connections = self._idle.setdefault(key, [])
+                if len(connections) < self.pool_size:
+                    connections.append((conn, time.monotonic()))
+                    return
+        conn.close()
+
+    def _new_connection(self, key):
+        scheme, netloc = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+
+        proxy = self._proxies.get(scheme)
+        host = urllib.parse.urlsplit('//' + netloc).hostname
+        if not proxy or urllib.request.proxy_bypass(host):
+            return connection_class(netloc)
+
+        proxy_split = urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+        proxy_headers = {}
+        if proxy_split.username:
+            credentials = '{}:{}'.format(urllib.parse.unquote(proxy_split.username), urllib.parse.unquote(proxy_split.password or ''))
+            proxy_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode('ascii')
+
+        proxy_netloc = proxy_split.netloc.rpartition('@')[2]
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(proxy_netloc)
+            conn.set_tunnel(netloc, headers=proxy_headers)
+        else:
+            conn = _HTTPProxyConnection(proxy_netloc, proxy_headers)
+        return conn
+
+
+class _HTTPProxyConnection(http.client.HTTPConnection):
+
+    def __init__(self, netloc, proxy_headers):
+        super().__init__(netloc)
+        self._proxy_headers = proxy_headers
+
+    def request(self, method, url, body=None, headers={}, **kwargs):
+        headers = dict(headers)
+        headers.update(self._proxy_headers)
+        super().request(method, url, body, headers, **kwargs)
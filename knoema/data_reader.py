@@ -1,12 +1,78 @@
 """This module contains data definitions for Knoema client"""
 
+import calendar
+import collections
+import importlib
+import itertools
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from dateutil.relativedelta import relativedelta
 
+import numpy
 import pandas
 import knoema.api_definitions as definition
 import knoema.view_definitions as view_definition
 
+def _get_attribute_values(fields, attr_names, empty_value):
+    """The function returns values of member fields in order of given upper case attribute names"""
+
+    fields_by_name = {}
+    for key, value in fields.items():
+        fields_by_name.setdefault(key.upper(), value)
+    return tuple(fields_by_name.get(name, empty_value) for name in attr_names)
+
+def _get_column_values(tuples, field, key=None):
+    if key is None:
+        return [row[field] for row in tuples]
+    return [value[key] if value is not None else None for value in [row[field] for row in tuples]]
+
+def _import_backend(module_name):
+    """The function imports optional package required by Arrow and Polars backends"""
+
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        raise ImportError('Package {0} is required for this backend, install it with: pip install {0}'.format(module_name)) from e
+
+def _from_arrow(table, backend):
+    if backend == 'arrow':
+        return table
+    if backend == 'polars':
+        return _import_backend('polars').from_arrow(table)
+    raise ValueError('Backend should be pandas, arrow or polars')
+
+def _convert_frame(frame, backend):
+    """The function converts pandas frame with one row per record to frame of given backend"""
+
+    if backend == 'pandas' or frame is None:
+        return frame
+    if isinstance(frame.columns, pandas.MultiIndex):
+        raise ValueError('Frame with series in columns can be returned only by pandas backend, use long layout')
+    return _from_arrow(_import_backend('pyarrow').Table.from_pandas(frame, preserve_index=False), backend)
+
+def _convert_metadata_frame(frame, backend):
+    """The function converts metadata frame to frame of given backend with one row per series"""
+
+    if backend == 'pandas' or frame is None:
+        return frame
+
+    # values of attributes can be of different types in different series, so they are converted to strings
+    pyarrow = _import_backend('pyarrow')
+    frame = frame.T.reset_index()
+    arrays = []
+    for column_name in frame.columns:
+        column = frame[column_name]
+        if pandas.api.types.is_string_dtype(column.dtype):
+            arrays.append(pyarrow.array([_to_string(value) for value in column.tolist()], type=pyarrow.string()))
+        else:
+            arrays.append(pyarrow.Array.from_pandas(column))
+    return _from_arrow(pyarrow.Table.from_arrays(arrays, names=[str(column_name) for column_name in frame.columns]), backend)
+
+def _to_string(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
 class DataReader(object):
     """This class read data from Knoema and transform it to pandas frame"""
 
@@ -17,6 +83,9 @@ class DataReader(object):
         self.columns = None
         self.dimensions = []     
         self.separator = ';'
+        self.layout = 'wide'
+        self.backend = 'pandas'
+        self._members_attributes = {}
 
     def _get_series_name(self, series_point):
         names = []
@@ -25,22 +94,28 @@ class DataReader(object):
         names.append(series_point['Frequency'])
         return tuple(names) 
 
+    def _get_member_attributes(self, dim, member_name):
+        # members of dimension are indexed by name at first use, values of their attributes are built once per member
+        index = self._members_attributes.get(dim)
+        if index is None:
+            attr_names = [attr['name'].upper() for attr in dim.fields if not attr['isSystemField']]
+            members = {}
+            for item in dim.items:
+                members.setdefault(item.name, item)
+            index = self._members_attributes[dim] = (attr_names, members, {})
+
+        attr_names, members, attributes = index
+        values = attributes.get(member_name)
+        if values is None:
+            item = members.get(member_name)
+            values = _get_attribute_values(item.fields if item is not None else {}, attr_names, float("NaN"))
+            attributes[member_name] = values
+        return values
+
     def _get_series_with_metadata(self, series_point):
         names = []
         for dim in self.dimensions:
-            for item in dim.items:
-                if item.name == series_point[dim.id]:
-                    dim_attrs = item.fields
-                    break
-            for attr in dim.fields:          
-                if not attr['isSystemField']: 
-                    value_empty = True
-                    for key, value in dim_attrs.items(): 
-                        if definition.is_equal_strings_ignore_case(key, attr['name']):
-                            names.append(value)
-                            value_empty = False
-                    if value_empty:
-                        names.append(float("NaN"))
+            names.extend(self._get_member_attributes(dim, series_point[dim.id]))
         names.append(series_point.get('Unit'))
         names.append(series_point.get('Scale'))
         names.append(series_point.get('Mnemonics'))
@@ -82,17 +157,84 @@ class DataReader(object):
         return series
 
     def _load_dimensions(self):
-        for dim in self.dataset.dimensions:
-            self.dimensions.append(self.client.get_dimension(self.dataset.id, dim.id))
+        dimension_ids = [dim.id for dim in self.dataset.dimensions]
+        self.dimensions.extend(self.client.get_dimensions(self.dataset.id, dimension_ids))
+
+    def iter_pandasframes(self, series_per_frame=None):
+        """The method yields frames with data, readers which load data by pages yield frame per page"""
+        yield self.get_pandasframe()
     
 
 class SelectionDataReader(DataReader):
 
+    max_chunks_in_flight = 4
+
     def __init__(self, client, dim_values, transform = None):
         super().__init__(client)
         self.dim_values = dim_values
         self.transform = transform
 
+    def _load_parts(self, load, requests):
+        # parts are loaded concurrently but yielded in order, so they are processed as early as one by one;
+        # no more than max_chunks_in_flight responses are loaded or kept ahead of the consumer
+        if self.max_chunks_in_flight <= 1 or len(requests) <= 1:
+            for request in requests:
+                yield load(request)
+            return
+
+        executor = ThreadPoolExecutor(min(self.max_chunks_in_flight, len(requests)), thread_name_prefix='knoema-parts')
+        responses = collections.deque()
+        try:
+            for request in requests:
+                responses.append(executor.submit(load, request))
+                if len(responses) >= self.max_chunks_in_flight:
+                    yield responses.popleft().result()
+
+            while responses:
+                yield responses.popleft().result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_raw_frames(self, series_stream, series_per_frame, series_metadata):
+        """The method yields frame for every page of raw data or for every series_per_frame series,
+        series are taken from the stream of pairs of page fields and series, so only series of one frame are kept in memory"""
+        # names of series and formats of dates depend on all series of the result, so they are
+        # computed once by metadata of series to be the same in every frame and as by get
+        series_settings = StreamingResponseReader.get_series_settings(self, series_metadata)
+        first_fields = None
+        fields = None
+        series = []
+        for page_fields, item in series_stream:
+            if page_fields is not fields:
+                # the previous page is decoded completely
+                if series_per_frame is None and series:
+                    yield self._get_raw_frame(first_fields, fields, series, series_settings)
+                    series = []
+                fields = page_fields
+                if first_fields is None:
+                    first_fields = fields
+            series.append(item)
+
+            # the descriptor can follow series of the first page, so series are kept until it is decoded
+            if series_per_frame is not None and len(series) >= series_per_frame and (fields is not first_fields or 'descriptor' in fields):
+                start = 0
+                while len(series) - start >= series_per_frame:
+                    yield self._get_raw_frame(first_fields, fields, series[start:start + series_per_frame], series_settings)
+                    start += series_per_frame
+                series = series[start:]
+
+        if series:
+            yield self._get_raw_frame(first_fields, fields, series, series_settings)
+
+    def _get_raw_frame(self, first_fields, fields, series, series_settings):
+        # next pages may have no descriptor and dimension fields, so they are taken from the first page
+        part = definition.RawDataResponse({
+            'continuationToken': fields.get('continuationToken'),
+            'data': series,
+            'descriptor': fields['descriptor'] if fields.get('descriptor') is not None else first_fields.get('descriptor'),
+            'dimensionFields': fields['dimensionFields'] if fields.get('dimensionFields') is not None else first_fields.get('dimensionFields')})
+        return StreamingResponseReader(self, part, series_settings).get_pandasframe()
+
     def _get_dim_members(self, dim, splited_values):
         members = []
         for value in splited_values:
@@ -189,6 +331,8 @@ class SelectionDataReader(DataReader):
 class ResponseReader(object):
     def __init__(self, reader):
         self.include_metadata = reader.include_metadata
+        self.layout = reader.layout
+        self.backend = reader.backend
         self.dataset = reader.dataset
         self.reader = reader
         super().__init__()
@@ -211,17 +355,20 @@ class PivotResponseReader(ResponseReader):
             
         # create dataframe with data
         detail_columns = self._get_detail_columns(self.pivot_resp)
-        series = self._get_data_series(self.pivot_resp, detail_columns)
-        pandas_series = PandasHelper.creates_pandas_series(series, {}, detail_columns)
-        pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns)
+        if self.layout == 'long':
+            pandas_data_frame = self._get_long_frame(self.pivot_resp, names_of_dimensions, detail_columns)
+        else:
+            series = self._get_data_series(self.pivot_resp, detail_columns)
+            pandas_series = PandasHelper.creates_pandas_series(series, {}, detail_columns)
+            pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns)
         if not self.include_metadata:
             return pandas_data_frame
             
         # create dataframe with metadata
         series_with_attr = self._get_metadata_series(self.pivot_resp)
         pandas_series_with_attr = PandasHelper.creates_pandas_series(series_with_attr, {}, None)
-        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, names_of_dimensions, None)
-        return pandas_data_frame, pandas_data_frame_with_attr
+        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, names_of_dimensions, None, sort_index=False)
+        return pandas_data_frame, _convert_metadata_frame(pandas_data_frame_with_attr, self.backend)
 
     def _get_data_series(self, resp, detail_columns):
         series_map = {}
@@ -240,25 +387,9 @@ class PivotResponseReader(ResponseReader):
                 series_map[series_name] = series
 
             freq = series_point['Frequency']
-
-            if 'Time' in series_point:
-                curr_date_val = series_point['Time']
-                try:
-                    curr_date_val = datetime.strptime(series_point['Time'], '%Y-%m-%dT%H:%M:%SZ')
-
-                    if (freq == "W"):
-                        curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
-                except ValueError:
-                    pass
-            else:
-                curr_date_val = 'All time'
-
             if freq not in frequency_list:
                 frequency_list.append(freq)
-            if freq == "W":
-                curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
-            if freq == "FQ":
-                curr_date_val = TimeFormat.format_statistical(curr_date_val, 'FQ')
+            curr_date_val = self._get_time_point(series_point, freq)
             if detail_columns is not None:
                 columns = []
                 for column_name in detail_columns:
@@ -271,6 +402,47 @@ class PivotResponseReader(ResponseReader):
 
         return series_map
 
+    def _get_long_frame(self, resp, names_of_dimensions, detail_columns):
+        builder = LongFrameBuilder(names_of_dimensions, detail_columns)
+        frequency_list = []
+        for series_point in resp.tuples:
+            val = series_point['Value']
+            if val is None:
+                continue
+            freq = series_point['Frequency']
+            if freq not in frequency_list:
+                frequency_list.append(freq)
+            columns = [series_point[column_name] for column_name in detail_columns] if detail_columns is not None else None
+            # dimensions missing in the point are left empty, so members stay in columns of their dimensions
+            series_name = tuple(series_point.get(dim.id) for dim in self.dataset.dimensions)
+            if self.dataset.has_time:
+                series_name += (freq,)
+            builder.add_value(series_name, self._get_time_point(series_point, freq), val, columns)
+
+        if 'FQ' in frequency_list and len(frequency_list) > 1:
+            raise ValueError('Please provide a valid frequency list. You can request FQ or others frequencies not together.')
+
+        return builder.get_frame(self.backend)
+
+    def _get_time_point(self, series_point, freq):
+        if 'Time' in series_point:
+            curr_date_val = series_point['Time']
+            try:
+                curr_date_val = datetime.strptime(series_point['Time'], '%Y-%m-%dT%H:%M:%SZ')
+
+                if (freq == "W"):
+                    curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
+            except ValueError:
+                pass
+        else:
+            curr_date_val = 'All time'
+
+        if freq == "W":
+            curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
+        if freq == "FQ":
+            curr_date_val = TimeFormat.format_statistical(curr_date_val, 'FQ')
+        return curr_date_val
+
     def _get_series_name(self, series_point):
         names = []
         for dim in self.dataset.dimensions:
@@ -283,35 +455,33 @@ class PivotResponseReader(ResponseReader):
     def _get_metadata_series(self, resp):
         series = {}
         names_of_attributes = self._get_attribute_names(resp)
+        members_attributes = self._get_members_attributes(resp)
         for series_point in resp.tuples:
             serie_name = self._get_series_name(series_point)
             if serie_name not in series:
-                serie_attrs = self._get_series_with_metadata(series_point, resp)
+                serie_attrs = self._get_series_with_metadata(series_point, members_attributes)
                 series[serie_name] = KnoemaSeries(serie_name, serie_attrs, names_of_attributes, None)
         return series  
 
-    def _get_series_with_metadata(self, series_point, resp):
-        names = []
+    def _get_members_attributes(self, resp):
+        # for every dimension with metadata the list contains its id and map of member name to values of attributes
+        members_attributes = []
         resp_dims = [dim for dim in (resp.header + resp.stub + resp.filter) if dim.fields and any(dim.fields)]
         for dim in resp_dims:
             if dim.dimensionid == 'Time' or not dim.metadataFields:
                 continue
+            attr_names = [attr['name'].upper() for attr in dim.fields if not attr['isSystemField']]
+            members = {}
             for item in dim.metadataFields:
-                if item.name == series_point[dim.dimensionid]:
-                    dim_attrs = item.fields
-                    break
+                if item.name not in members:
+                    members[item.name] = _get_attribute_values(item.fields, attr_names, None)
+            members_attributes.append((dim.dimensionid, members, (None,) * len(attr_names)))
+        return members_attributes
 
-            for attr in dim.fields: 
-                find_elem = False
-                if attr['isSystemField']:
-                    continue
-                for key, value in dim_attrs.items(): 
-                    if definition.is_equal_strings_ignore_case(key, attr['name']):
-                        find_elem = True
-                        names.append(value)
-                        break
-                if not find_elem:
-                    names.append(None)
+    def _get_series_with_metadata(self, series_point, members_attributes):
+        names = []
+        for dimensionid, members, empty_values in members_attributes:
+            names.extend(members.get(series_point[dimensionid], empty_values))
 
         names.append(series_point.get('Unit'))
         names.append(series_point.get('Scale'))
@@ -338,39 +508,70 @@ class PivotResponseReader(ResponseReader):
         return names
 
 class StreamingResponseReader(ResponseReader):
-    def __init__(self, reader, data_streaming):
+    def __init__(self, reader, data_streaming, series_settings=None):
         self.data_streaming = data_streaming
+        self.series_settings = series_settings
         super().__init__(reader)
+
+    @staticmethod
+    def get_series_settings(reader, series):
+        """The method checks frequencies of series and returns frequencies with statistical format of dates
+        and members of dimensions named with id, so they can be used for parts of the same series"""
+        response_reader = StreamingResponseReader(reader, None)
+        frequency_list = []
+        for series_point in series:
+            if series_point['frequency'] not in frequency_list:
+                frequency_list.append(series_point['frequency'])
+        response_reader._check_frequencies(frequency_list)
+        return response_reader._get_use_stat_format_for_date_label(series), response_reader._get_dimensions_members_with_id(series)
     
     def get_pandasframe(self):
         detail_columns = self._get_detail_columns(self.data_streaming)
-        # create dataframe with data
-        series = self._get_data_series(self.data_streaming, detail_columns)
-
-        pandas_series = {}
         names_of_dimensions = self.reader._get_dimension_names()
         if self.include_metadata:
             pandas_series_with_attr = {}
             names_of_attributes = self._get_attribute_names()
 
-        pandas_series = PandasHelper.creates_pandas_series(series, pandas_series, detail_columns)
-        pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns)
+        # create dataframe with data
+        if self.layout == 'long':
+            pandas_data_frame = self._get_long_frame(self.data_streaming, names_of_dimensions, detail_columns)
+        else:
+            series = self._get_data_series(self.data_streaming, detail_columns)
+            pandas_series = PandasHelper.creates_pandas_series(series, {}, detail_columns)
+            pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns)
         if not self.include_metadata:
             return pandas_data_frame
             
         # create dataframe with metadata
         series_with_attr = self._get_metadata_series(self.data_streaming, names_of_attributes)
         pandas_series_with_attr = PandasHelper.creates_pandas_series(series_with_attr, pandas_series_with_attr, None)
-        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, names_of_dimensions, None)         
-        return pandas_data_frame, pandas_data_frame_with_attr
+        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, names_of_dimensions, None, sort_index=False)         
+        return pandas_data_frame, _convert_metadata_frame(pandas_data_frame_with_attr, self.backend)
 
     def _get_data_series(self, resp, detail_columns):
         series_map = {}
-        dict_with_delta = TimeFormat.get_frequencies_delta()
+        for series_name, index, values, column_values in self._get_series_observations(resp, detail_columns):
+            series = KnoemaSeries(series_name, values, index, detail_columns)
+            if column_values is not None:
+                series.column_values = column_values
+            series_map[series_name] = series
+        return series_map
+
+    def _get_long_frame(self, resp, names_of_dimensions, detail_columns):
+        builder = LongFrameBuilder(names_of_dimensions, detail_columns)
+        for series_name, index, values, column_values in self._get_series_observations(resp, detail_columns):
+            builder.add_values(series_name, index, values, column_values)
+        return builder.get_frame(self.backend)
+
+    def _get_series_observations(self, resp, detail_columns):
+        """The method yields name, index, values and values of detail columns for every series of response"""
 
         frequency_list = []
-        use_stat_format_for_date_label = self._get_use_stat_format_for_date_label(resp.series)
-        dimensions_members_with_id = self._get_dimensions_members_with_id(resp.series)
+        if self.series_settings is not None:
+            use_stat_format_for_date_label, dimensions_members_with_id = self.series_settings
+        else:
+            use_stat_format_for_date_label = self._get_use_stat_format_for_date_label(resp.series)
+            dimensions_members_with_id = self._get_dimensions_members_with_id(resp.series)
 
         detail_values = None
         for series_point in resp.series:  
@@ -389,30 +590,39 @@ class StreamingResponseReader(ResponseReader):
             if (freq == "W"):
                 data_begin_val = data_begin_val - timedelta(days = data_begin_val.weekday())
             
-            delta = dict_with_delta[freq]
-            series = KnoemaSeries(series_name, [], [], detail_columns)
             date_labels = series_point['dateLabels'] if 'dateLabels' in series_point else None
-            curr_date_val = data_begin_val
-            for vi in range(0, len(all_values)):
-                val = all_values[vi]
-                if val is not None:
-                    date = curr_date_val if freq != 'FQ' else TimeFormat.format_statistical(curr_date_val, 'FQ')
-                    if freq in use_stat_format_for_date_label or date_labels is not None and date_labels[vi] is not None:
-                        date = TimeFormat.format_statistical(curr_date_val, freq) \
-                            if freq in use_stat_format_for_date_label else datetime.strptime(date_labels[vi], date_format)
-                    series.index.append(date)
-                    series.values.append(val)
-                    for ai in range(0, series.column_count):
-                        series.column_values[ai].append(detail_values[ai][vi])
-                curr_date_val += delta
 
-            series_map[series_name] = series
+            values = numpy.empty(len(all_values), dtype=object)
+            values[:] = all_values
+            positions = numpy.flatnonzero(values != None)
+            if len(positions) == 0:
+                yield series_name, [], [], [[] for _ in detail_columns] if detail_columns is not None else None
+                continue
+
+            dates = TimeFormat.get_dates(data_begin_val, freq, len(all_values))
+
+            if freq in use_stat_format_for_date_label:
+                index = TimeFormat.format_statistical_dates(dates[positions], freq)
+            else:
+                index = TimeFormat.format_statistical_dates(dates, 'FQ') if freq == 'FQ' else dates
+                if date_labels is not None:
+                    for vi in positions:
+                        if date_labels[vi] is not None:
+                            index[vi] = datetime.strptime(date_labels[vi], date_format)
+                index = [index[vi] for vi in positions] if freq == 'FQ' else TimeFormat.to_datetime_index(index[positions])
 
+            column_values = None
+            if detail_values is not None:
+                column_values = [[column[vi] for vi in positions] for column in detail_values]
+
+            yield series_name, index, values[positions].tolist(), column_values
+
+        self._check_frequencies(frequency_list)
+
+    def _check_frequencies(self, frequency_list):
         if 'FQ' in frequency_list and len(frequency_list) > 1:
             raise ValueError('Please provide a valid frequency list. You can request FQ or others frequencies not together.')
 
-        return series_map
-
     def _get_use_stat_format_for_date_label(self, series):
         use_stat_format_for_date_label = {}
         date_labels_by_freq = {}
@@ -435,8 +645,6 @@ class StreamingResponseReader(ResponseReader):
 
             date_labels = series_point['dateLabels']
 
-            all_values = series_point['values']  
-
             date_format = '%Y-%m-%dT%H:%M:%S' + ('Z' if series_point['startDate'].endswith('Z') else '')
             data_begin_val = datetime.strptime(series_point['startDate'], date_format)
             if (freq == "W"):
@@ -444,7 +652,8 @@ class StreamingResponseReader(ResponseReader):
             
             delta = dict_with_delta[freq]
             curr_date_val = data_begin_val
-            for vi in range(0, len(all_values)):
+            # labels are given for every value, so series of metadata without values are checked too
+            for vi in range(0, len(date_labels)):
                 if curr_date_val in date_labels_by_freq[freq]:
                     if date_labels[vi] is not None and date_labels_by_freq[freq][curr_date_val] != date_labels[vi]:
                         use_stat_format_for_date_label[freq] = True
@@ -539,62 +748,52 @@ class DetailsResponseReader(ResponseReader):
         super().__init__(reader)
     
     def get_pandasframe(self):
-        records = self.convert_pandasframe()
+        records = _convert_frame(self.convert_pandasframe(), self.backend)
         if not self.include_metadata:
             return records
         return records, None
 
     def convert_pandasframe(self):
-        titles = []
+        # every column is built in one pass over the rows, names of dimension members are categorical
+        columns = self._get_columns()
+        tuples = self.data_resp.tuples
+        if not tuples:
+            return pandas.DataFrame(data=[], columns=[column[0] for column in columns])
+
+        data = {}
+        for i, (_, field, key, is_dimension) in enumerate(columns):
+            values = _get_column_values(tuples, field, key)
+            data[i] = pandas.Categorical(values) if is_dimension else values
+
+        frame = pandas.DataFrame(data, columns=range(len(columns)))
+        frame.columns = [column[0] for column in columns]
+        return frame
+
+    def _get_columns(self):
+        # the list of (title, field, key of value in the field or None, whether it's a name of dimension member)
+        # ordered as columns of the response
         columns = []
-        indexes = []
         for col in self.data_resp.columns:
-            indexes.append(col['index'])
             if col['dimensionId'] != None:
                 if 'detailColumns' in col:
-                    titles.append(col['name'])
-                    columns.append([col['id'], 'name'])
+                    columns.append((col['index'], col['name'], col['id'], 'name', True))
                     for detail in col['detailColumns']:
-                        indexes.append(detail['index'])
-                        titles.append(detail['name'])
-                        columns.append([col['id'], detail['id']])
+                        columns.append((detail['index'], detail['name'], col['id'], detail['id'], False))
                 else:
-                    titles.append(col['name'])
-                    columns.append(col['id'])
+                    columns.append((col['index'], col['name'], col['id'], None, True))
+            elif col['type'] == 'Date' or col['type'] == 'Currency':
+                columns.append((col['index'], col['name'], col['id'], 'value', False))
             else:
-                if col['type'] == 'Date':
-                    titles.append(col['name'])
-                    columns.append([col['id'], 'value'])
-                    continue
-
-                if col['type'] == 'Currency':
-                    titles.append(col['name'])
-                    columns.append([col['id'], 'value'])
-                    continue
+                columns.append((col['index'], col['name'], col['id'], None, False))
 
-                titles.append(col['name'])
-                columns.append(col['id'])
-
-        #sort both array by indexes
-        titles, columns = zip(*[x for _,x in sorted(zip(indexes, zip(titles, columns)))])
-        records = []
-        for tuple in self.data_resp.tuples:
-            record = []
-
-            for col in columns:
-                if isinstance(col, str):
-                    val = tuple[col]
-                    record.append(val)
-                else:
-                    val = tuple[col[0]]
-                    record.append(val[col[1]] if val != None else None)
-
-            records.append(record)
-
-        return pandas.DataFrame(data=records, columns=titles)        
+        columns.sort(key=lambda column: column[0])
+        return [column[1:] for column in columns]
 
 class TransformationDataReader(SelectionDataReader):
 
+    detail_members_per_request = 100
+    detail_rows_per_request = 100000
+
     def __init__(self, client, dim_values, transform, frequency):
         if dim_values == None:
             dim_values = {}
@@ -611,11 +810,9 @@ class TransformationDataReader(SelectionDataReader):
             return response_reader.get_pandasframe()
 
         if isinstance(data_resp, definition.RawDataResponse):
-            token = data_resp.continuation_token
-            while token is not None:
-                res2 = self.client.get_data_raw_with_token(token)
-                data_resp.series += res2.series
-                token = res2.continuation_token
+            if data_resp.continuation_token is not None:
+                for page in self.client.iter_data_raw_pages_with_token(data_resp.continuation_token):
+                    data_resp.series += page.series
 
             response_reader = StreamingResponseReader(self, data_resp)
             return response_reader.get_pandasframe()
@@ -623,6 +820,90 @@ class TransformationDataReader(SelectionDataReader):
         response_reader = PivotResponseReader(self, data_resp)
         return response_reader.get_pandasframe()
 
+    def iter_pandasframes(self, series_per_frame=None):
+        """The method yields frame for every page of data or for every series_per_frame series,
+        data of flat datasets is yielded by parts of the selection planned by plan_requests"""
+        if self.dataset.type != 'Regular':
+            load = lambda request: self.client.get_dataset_data(self.dataset.id, request)
+            for data_resp in self._load_parts(load, self.plan_requests()):
+                reader = DetailsResponseReader(self, data_resp) if isinstance(data_resp, definition.DetailsResponse) else PivotResponseReader(self, data_resp)
+                yield reader.get_pandasframe()
+            return
+
+        data_resp = self.client.get_dataset_data(self.dataset.id, self._get_data_filters())
+        if not isinstance(data_resp, definition.RawDataResponse):
+            reader = DetailsResponseReader(self, data_resp) if isinstance(data_resp, definition.DetailsResponse) else PivotResponseReader(self, data_resp)
+            yield reader.get_pandasframe()
+            return
+
+        first_fields = {'continuationToken': data_resp.continuation_token, 'descriptor': data_resp.descriptor, 'dimensionFields': data_resp.dimensionFields}
+        series_stream = ((first_fields, series) for series in data_resp.series)
+        series_metadata = data_resp.series
+        if data_resp.continuation_token is not None:
+            series_stream = itertools.chain(series_stream, self.client.iter_data_raw_pages_with_token(data_resp.continuation_token).iter_series())
+            series_metadata = self.get_series_metadata()
+        yield from self._iter_raw_frames(series_stream, series_per_frame, series_metadata)
+
+    def get_series_metadata(self):
+        """The method returns metadata of series of the selection, timerange is passed to select the same series
+        as the data request, other parameters of time and transform are not supported by raw requests and are not passed"""
+        dim_values = {}
+        for name, value in self.dim_values.items():
+            if name.lower() not in ['transform', 'timesince', 'timelast', 'timemembers']:
+                dim_values[name] = value
+
+        metadata_reader = StreamingDataReader(self.client, dim_values)
+        metadata_reader.dataset = self.dataset
+        metadata_reader.separator = self.separator
+        return metadata_reader.get_series_metadata()
+
+    def plan_requests(self):
+        """
+        The method splits the request into requests of parts. Rows of the request are estimated by the product of amounts
+        of selected members and of members with data of dimensions without selection, which are loaded for that.
+        The dimension with the most members is split, so every part has no more than detail_members_per_request
+        of its members and about detail_rows_per_request rows. Rows of the same members can repeat, so the amount
+        of rows of a part is estimated, not bounded. Selections with aggregation are not split.
+        """
+        request = self._get_data_filters()
+        split_dim_id = None
+        members = []
+        rows = 1
+        for dim in self.dataset.dimensions:
+            if dim.id not in request.filters:
+                continue
+            # repeated members are requested once, so rows are not loaded twice by different parts
+            dim_members = list(dict.fromkeys(member for member in request.filters[dim.id].split(self.separator) if member))
+            # members of aggregation are aggregated together, so such selection is passed whole
+            if any(member.startswith('@') for member in dim_members):
+                continue
+            rows *= len(dim_members)
+            if len(dim_members) > len(members):
+                split_dim_id = dim.id
+                members = dim_members
+
+        dimension_ids = [dim.id for dim in self.dataset.dimensions if dim.id not in request.filters]
+        for dimension in self.client.get_dimensions(self.dataset.id, dimension_ids) if dimension_ids else []:
+            # members are passed by ids like members of selections, names are passed for members without id
+            dim_members = list(dict.fromkeys(member.fields.get('id') or member.name for member in dimension.items if member.hasdata))
+            rows *= max(len(dim_members), 1)
+            if len(dim_members) > len(members) and not any(self.separator in member for member in dim_members):
+                split_dim_id = dimension.id
+                members = dim_members
+
+        part_count = max(-(-len(members) // self.detail_members_per_request), -(-rows // self.detail_rows_per_request))
+        part_count = min(part_count, len(members))
+        if part_count <= 1:
+            return [request]
+
+        part_size = -(-len(members) // part_count)
+        requests = []
+        for i in range(0, len(members), part_size):
+            filters = dict(request.filters)
+            filters[split_dim_id] = self.separator.join(members[i:i + part_size])
+            requests.append(definition.DataAPIRequest(filters))
+        return requests
+
     def _get_data_filters(self):
         filter_dims = {}
         passed_params = ['timerange', 'transform', 'timesince', 'timelast', 'timemembers']
@@ -660,8 +941,12 @@ class TransformationDataReader(SelectionDataReader):
 
 class StreamingDataReader(SelectionDataReader):
 
-    def __init__(self, client, dim_values, transform = None, group_by = None):
+    chunk_point_limit = 50000
+    chunk_member_limit = 200
+
+    def __init__(self, client, dim_values, transform = None, group_by = None, max_chunks_in_flight = 4):
         self.group_by = group_by
+        self.max_chunks_in_flight = max_chunks_in_flight
 
         super().__init__(client, dim_values, transform)
     
@@ -680,6 +965,13 @@ class StreamingDataReader(SelectionDataReader):
         response_reader = StreamingResponseReader(self, data_streaming)
         return response_reader.get_pandasframe()
 
+    def iter_pandasframes(self, series_per_frame=None):
+        """The method yields frame for every page of data or for every series_per_frame series"""
+        self._load_dimensions()
+        pivot_req = self._create_pivot_request()
+        series_metadata = self.client.get_data_raw(pivot_req, True).series
+        yield from self._iter_raw_frames(self.client.iter_data_raw_pages(pivot_req).iter_series(), series_per_frame, series_metadata)
+
     def _get_series_with_attr(self, series, series_with_attr):
         res = {}
         for series_name, _ in series.items():
@@ -703,80 +995,48 @@ class StreamingDataReader(SelectionDataReader):
 
         return sorted_frequency[norm_index]
 
-    def _get_all_series_for_group(self, group_name, group_name_index, frequency, series, metadata):
-        series_by_group = {}
-        for series_name, series_item in series.items():
-            if series_name[group_name_index] == group_name:
-                series_by_group[series_name] = series_item
-        
-        available_frequency = {}
-        count = 0
+    def _get_group_series_counts(self, metadata, frequency):
+        available_frequency_by_group = {}
         for md in metadata:
-            if md[self.group_by]['name'] == group_name:
-                freq = md['frequency']
-                if freq not in available_frequency:
-                    available_frequency[freq] = 0
-                    
-                available_frequency[freq] += 1
-                count += 1
-
-        if frequency == None:
-            if len(series_by_group.keys()) == count:
-                return series_by_group
-            else:
-                return None
+            available_frequency = available_frequency_by_group.setdefault(md[self.group_by]['name'], {})
+            freq = md['frequency']
+            available_frequency[freq] = available_frequency.get(freq, 0) + 1
+
+        series_counts = {}
+        for group_name, available_frequency in available_frequency_by_group.items():
+            if frequency == None:
+                series_counts[group_name] = sum(available_frequency.values())
+                continue
 
-        if len(available_frequency.keys()) == 0:
-            return None
+            norm_frequency = frequency
+            if frequency not in available_frequency.keys():
+                norm_frequency = self._get_frequency_for_normalization(frequency, available_frequency)
+            series_counts[group_name] = available_frequency[norm_frequency]
 
-        norm_frequency = frequency
-        if frequency not in available_frequency.keys():
-            norm_frequency = self._get_frequency_for_normalization(frequency, available_frequency)
-        
-        if len(series_by_group.keys()) == available_frequency[norm_frequency]:
-                return series_by_group
-
-        return None
+        return series_counts
 
     def get_pandasframe_by_metadata_grouped(self, metadata, frequency, timerange):
         self._load_dimensions()
         names_of_dimensions = self._get_dimension_names()
         
-        series = {}
-        series_with_attr = {}
-        offset = 0
-        detail_columns = None
-        was = False
-        while True:
-            metadata_part = self._get_part_of_metadata(metadata, offset)
-            if metadata_part == None:
-                break
-
-            offset += len(metadata_part)
+        pivot_requests = [self._create_part_request(metadata[start:end], frequency, timerange) for start, end in self.plan_chunks(metadata)]
 
-            dim_values = {}
-            for item in metadata_part:
-                for dim in self.dataset.dimensions:
-                    dim_id = dim.id
-
-                    if dim_id not in item:
-                        raise ValueError('There is no value for dim: {}'.format(dim_id))
-
-                    member_key = str(item[dim_id]['key'])
-                    if dim_id in dim_values:
-                        if member_key not in dim_values[dim_id]:
-                            dim_values[dim_id].append(member_key)
-                    else:
-                        dim_values[dim_id] = [member_key]
-
-            if frequency != None:
-                dim_values['frequency'] = frequency
-            if timerange != None:
-                dim_values['timerange'] = timerange
+        group_name_index = -1
+        for i in range(len(self.dataset.dimensions)):
+            if self.group_by == self.dataset.dimensions[i].id or self.group_by == self.dataset.dimensions[i].name:
+                self.group_by = self.dataset.dimensions[i].id
+                group_name_index = i
+                break
 
-            self.dim_values = dim_values
-            pivot_req = self._create_pivot_request()
-            pivot_resp = self.client.get_data_raw(pivot_req)
+        # series are kept by groups until the amount of series of the group expected by metadata is loaded
+        series_counts = self._get_group_series_counts(metadata, frequency)
+        series_by_group = {}
+        series_with_attr_by_group = {}
+        group_numbers = {}
+        group_counter = itertools.count()
+        detail_columns = None
+        was = False
+        for pivot_resp in self._load_parts(self.client.get_data_raw, pivot_requests):
             response_reader = StreamingResponseReader(self, pivot_resp)
 
             if was:
@@ -789,110 +1049,117 @@ class StreamingDataReader(SelectionDataReader):
                 detail_columns = response_reader._get_detail_columns(pivot_resp)
 
             part_series = response_reader._get_data_series(pivot_resp, detail_columns)
-            series.update(part_series)
+            part_groups = set()
+            for series_name, series_item in part_series.items():
+                group_name = series_name[group_name_index]
+                if group_name not in series_by_group:
+                    series_by_group[group_name] = {}
+                    group_numbers[group_name] = next(group_counter)
+                series_by_group[group_name][series_name] = series_item
+                part_groups.add(group_name)
 
             if self.include_metadata:
                 names_of_attributes = self._get_attribute_names()
                 part_series_with_attr = response_reader._get_metadata_series(pivot_resp, names_of_attributes)
-                series_with_attr.update(part_series_with_attr)
+                for series_name, series_item in part_series_with_attr.items():
+                    series_with_attr_by_group.setdefault(series_name[group_name_index], {})[series_name] = series_item
 
-            group_name_index = -1
-            for i in range(len(self.dataset.dimensions)):
-                if self.group_by == self.dataset.dimensions[i].id or self.group_by == self.dataset.dimensions[i].name:
-                    self.group_by = self.dataset.dimensions[i].id
-                    group_name_index = i
-                    break
+            # only groups which got series can be completed, they are yielded in order of their first series
+            for group_name in sorted(part_groups, key=group_numbers.get):
+                all_series_by_group = series_by_group[group_name]
+                if len(all_series_by_group) != series_counts.get(group_name):
+                    continue
 
-            groups_to_delete = []
-            groups_checked = []
-            for series_name, series_item in series.items():
-                group_name = series_name[group_name_index]
+                del series_by_group[group_name]
+                del group_numbers[group_name]
+                all_panda_series_by_group = PandasHelper.creates_pandas_series(all_series_by_group, {}, detail_columns)
+                data_frame = definition.DataFrame()
+                data_frame.id = group_name
+                data_frame.data = PandasHelper.create_pandas_dataframe(all_panda_series_by_group, names_of_dimensions, detail_columns)
 
-                if group_name in groups_to_delete:
-                    continue
-                if group_name in groups_checked:
-                    continue
+                if self.include_metadata:
+                    all_series_with_attr_by_group = self._get_series_with_attr(all_series_by_group, series_with_attr_by_group.pop(group_name, {}))
+                    all_pandes_series_with_attr_by_group = PandasHelper.creates_pandas_series(all_series_with_attr_by_group, {}, None)
+                    data_frame.metadata = PandasHelper.create_pandas_dataframe(all_pandes_series_with_attr_by_group, names_of_dimensions, None, sort_index=False)
 
-                all_series_by_group = self._get_all_series_for_group(group_name, group_name_index, frequency, series, metadata)
-                if all_series_by_group != None:
-                    groups_to_delete.append(group_name)
-                    all_panda_series_by_group = PandasHelper.creates_pandas_series(all_series_by_group, {}, detail_columns)
-                    data_frame = definition.DataFrame()
-                    data_frame.id = group_name
-                    data_frame.data = PandasHelper.create_pandas_dataframe(all_panda_series_by_group, names_of_dimensions, detail_columns)
-
-                    if self.include_metadata:
-                        all_series_with_attr_by_group = self._get_series_with_attr(all_series_by_group, series_with_attr)
-                        all_pandes_series_with_attr_by_group = PandasHelper.creates_pandas_series(all_series_with_attr_by_group, {}, None)
-                        data_frame.metadata = PandasHelper.create_pandas_dataframe(all_pandes_series_with_attr_by_group, names_of_dimensions, None)
-                        
-                    yield data_frame
-                else:
-                    groups_checked.append(group_name)
+                yield data_frame
 
-            left_series = {}
-            for series_name, series_item in series.items():
-                group_name = series_name[group_name_index]
-                if group_name not in groups_to_delete:
-                    left_series[series_name] = series_item
-                
-            series = left_series
+    def _create_part_request(self, metadata_part, frequency, timerange):
+        # members are kept in dicts which preserve the order of the first occurrence
+        members = {}
+        for item in metadata_part:
+            for dim in self.dataset.dimensions:
+                dim_id = dim.id
 
-            left_series_with_attr = {}
-            for series_name, series_item in series_with_attr.items():
-                group_name = series_name[group_name_index]
-                if group_name not in groups_to_delete:
-                    left_series_with_attr[series_name] = series_item
-                
-            series_with_attr = left_series_with_attr
+                if dim_id not in item:
+                    raise ValueError('There is no value for dim: {}'.format(dim_id))
 
-    def _get_part_of_metadata(self, metadata, offset):
-        limit = 50000
-        member_count_limit = 200
+                members.setdefault(dim_id, {})[str(item[dim_id]['key'])] = None
 
-        if offset >= len(metadata):
-            return None
+        dim_values = {dim_id: list(dim_members) for dim_id, dim_members in members.items()}
 
-        curr_points = 0
-        curr_member_count = 0
-        time_points = 0
-        dim_values = {}
-        index = offset
-        for i in range(offset, len(metadata)):
-            curr_ts = metadata[i]
-            curr_time_points = self._get_time_point_amount(curr_ts['startDate'], curr_ts['endDate'], curr_ts['frequency'])
-            if curr_time_points > time_points:
-                time_points = curr_time_points
+        if frequency != None:
+            dim_values['frequency'] = frequency
+        if timerange != None:
+            dim_values['timerange'] = timerange
 
-            curr_points = time_points
-            curr_member_count = 0
-            for dim in self.dataset.dimensions:
-                dim_id = dim.id
+        self.dim_values = dim_values
+        return self._create_pivot_request()
+
+    def plan_chunks(self, metadata):
+        """
+        The method splits series metadata into parts loaded by separate requests and returns list of (start, end)
+        bounds of the parts. A part is closed when the amount of points of its selection (the longest series multiplied
+        by the amounts of members of every dimension) reaches chunk_point_limit or the amount of members reaches chunk_member_limit.
+        """
+        dimension_ids = [dim.id for dim in self.dataset.dimensions]
+        chunks = []
+        start = 0
+        members = None
+        i = 0
+        while i < len(metadata):
+            if members is None:
+                members = [set() for _ in dimension_ids]
+                member_product = 1
+                member_count = 0
+                time_points = 0
 
+            curr_ts = metadata[i]
+            time_points = max(time_points, self._get_series_time_point_amount(curr_ts))
+            for dim_id, dim_members in zip(dimension_ids, members):
                 if dim_id not in curr_ts:
                     raise ValueError('There is no value for dim: {}'.format(dim_id))
 
                 member_key = str(curr_ts[dim_id]['key'])
-                if dim_id in dim_values:
-                    if member_key not in dim_values[dim_id]:
-                        dim_values[dim_id].append(member_key)
-                else:
-                    dim_values[dim_id] = [member_key]
+                if member_key not in dim_members:
+                    # the product of amounts of members is updated for the grown dimension only
+                    if dim_members:
+                        member_product = member_product // len(dim_members) * (len(dim_members) + 1)
+                    dim_members.add(member_key)
+                    member_count += 1
+
+            if time_points * member_product < self.chunk_point_limit and member_count < self.chunk_member_limit:
+                i += 1
+                continue
 
-                curr_points = curr_points * len(dim_values[dim_id])
-                curr_member_count = curr_member_count + len(dim_values[dim_id])
+            # the series which exceeds the limits starts the next part, unless it is the only series of the part
+            end = i + 1 if i == start else i
+            chunks.append((start, end))
+            start = i = end
+            members = None
 
-            if curr_points >= limit or curr_member_count >= member_count_limit:
-                break
+        if start < len(metadata):
+            chunks.append((start, len(metadata)))
 
-            index = i
+        return chunks
 
-        return metadata[offset:min(index + 1, len(metadata))]
+    def _get_series_time_point_amount(self, series_metadata):
+        # the amount is kept in the metadata entry, as the entry the part stops at is checked again for the next part
+        if '_timePointAmount' not in series_metadata:
+            series_metadata['_timePointAmount'] = self._get_time_point_amount(series_metadata['startDate'], series_metadata['endDate'], series_metadata['frequency'])
+        return series_metadata['_timePointAmount']
 
     def _get_time_point_amount(self, start_date, end_date, frequency):
-        count = 0
-        dict_with_delta = TimeFormat.get_frequencies_delta()
-
         date_format = '%Y-%m-%dT%H:%M:%S' + ('Z' if start_date.endswith('Z') else '')
         data_begin_val = datetime.strptime(start_date, date_format)
         date_format = '%Y-%m-%dT%H:%M:%S' + ('Z' if end_date.endswith('Z') else '')
@@ -900,11 +1167,7 @@ class StreamingDataReader(SelectionDataReader):
         if (frequency == "W"):
             data_begin_val = data_begin_val - timedelta(days = data_begin_val.weekday())
             data_end_val = data_end_val - timedelta(days = data_end_val.weekday())
-        delta = dict_with_delta[frequency]
-        curr_date_val = data_begin_val
-        while curr_date_val<=data_end_val:
-            curr_date_val += delta
-            count += 1
+        count = TimeFormat.get_date_amount(data_begin_val, data_end_val, frequency)
 
         # we have to increase amount of points for FQ freq because of export from OASIS issue
         if frequency == 'FQ':
@@ -946,19 +1209,10 @@ class MnemonicsDataReader(DataReader):
             if series_name not in series:
                 series[series_name] = KnoemaSeries(series_name, [], [], detail_columns)
 
-            curr_date_val = series_point['Time']
-            try:
-                curr_date_val = datetime.strptime(series_point['Time'], '%Y-%m-%dT%H:%M:%SZ')
-            except ValueError:
-                pass
-
             freq = series_point['Frequency']
             if freq not in frequency_list:
                 frequency_list.append(freq)
-            if (freq == "W"):
-                curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
-            if (freq == 'FQ'):
-                curr_date_val = TimeFormat.format_statistical(curr_date_val, 'FQ')
+            curr_date_val = self._get_time_point(series_point, freq)
             series[series_name].add_value(series_point['Value'], curr_date_val, None)
 
         if 'FQ' in frequency_list and len(frequency_list) > 1:
@@ -966,6 +1220,33 @@ class MnemonicsDataReader(DataReader):
 
         return series
 
+    def _add_long_values(self, builder, resp):
+        frequency_list = []
+        for series_point in resp.tuples:
+            val = series_point['Value']
+            if val is None:
+                continue
+            freq = series_point['Frequency']
+            if freq not in frequency_list:
+                frequency_list.append(freq)
+            builder.add_value((series_point['Mnemonics'], freq), self._get_time_point(series_point, freq), val)
+
+        if 'FQ' in frequency_list and len(frequency_list) > 1:
+            raise ValueError('Please provide a valid frequency list. You can request FQ or others frequencies not together.')
+
+    def _get_time_point(self, series_point, freq):
+        curr_date_val = series_point['Time']
+        try:
+            curr_date_val = datetime.strptime(series_point['Time'], '%Y-%m-%dT%H:%M:%SZ')
+        except ValueError:
+            pass
+
+        if (freq == "W"):
+            curr_date_val = curr_date_val - timedelta(days = curr_date_val.weekday())
+        if (freq == 'FQ'):
+            curr_date_val = TimeFormat.format_statistical(curr_date_val, 'FQ')
+        return curr_date_val
+
     def _get_pandasframe_one_dataset(self):
         pandas_series = {}
         if self.include_metadata:
@@ -976,24 +1257,31 @@ class MnemonicsDataReader(DataReader):
         mnemonics_string = self.separator.join(mnemonics) if isinstance(mnemonics, list) else mnemonics
         mnemonics_resp = self.client.get_mnemonics(mnemonics_string, self.transform, self.frequency)
         detail_columns = None
+        builder = LongFrameBuilder(['Mnemonics', 'Frequency'], None) if self.layout == 'long' else None
             
         for item in mnemonics_resp.items:
             pivot_resp = item.pivot
             if not definition.is_equal_strings_ignore_case(self.dataset.id, pivot_resp.dataset):
                 continue
             # create dataframe with data for mnemonics
-            series = self._get_data_series(pivot_resp, detail_columns)
-            pandas_series = PandasHelper.creates_pandas_series(series, pandas_series, detail_columns)
+            if builder is not None:
+                self._add_long_values(builder, pivot_resp)
+            else:
+                series = self._get_data_series(pivot_resp, detail_columns)
+                pandas_series = PandasHelper.creates_pandas_series(series, pandas_series, detail_columns)
             if self.include_metadata:
                 # create dataframe with metadata for mnemonics
                 series_with_attr = self._get_metadata_series(pivot_resp, names_of_attributes)
                 pandas_series_with_attr = PandasHelper.creates_pandas_series(series_with_attr, pandas_series_with_attr, None)
 
-        pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, [], detail_columns)
+        if builder is not None:
+            pandas_data_frame = builder.get_frame(self.backend)
+        else:
+            pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, [], detail_columns)
         if not self.include_metadata:
             return pandas_data_frame
-        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, [], None)
-        return pandas_data_frame, pandas_data_frame_with_attr
+        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, [], None, sort_index=False)
+        return pandas_data_frame, _convert_metadata_frame(pandas_data_frame_with_attr, self.backend)
 
     def _get_pandasframe_across_datasets(self):
            
@@ -1005,37 +1293,48 @@ class MnemonicsDataReader(DataReader):
         if self.include_metadata:
             pandas_series_with_attr = {}
 
+        # metadata of all datasets is loaded before reading the data
+        dataset_ids = []
+        for item in mnemonics_resp.items:
+            if item.pivot is not None and item.pivot.dataset not in dataset_ids:
+                dataset_ids.append(item.pivot.dataset)
+        datasets = self.client.get_datasets(dataset_ids)
+        # dimensions of all datasets are loaded together, so they are not waited dataset by dataset
+        dataset_dimensions = [(dataset_id, dim.id) for dataset_id, dataset in zip(dataset_ids, datasets) for dim in dataset.dimensions]
+        dimensions = iter(self.client.get_datasets_dimensions(dataset_dimensions))
+        for dataset_id, dataset in zip(dataset_ids, datasets):
+            self.dataset = dataset
+            self.dimensions = list(itertools.islice(dimensions, len(dataset.dimensions)))
+            names_of_attributes = self._get_attribute_names() if self.include_metadata else None
+            dict_datasets[dataset_id] = (dataset, self.dimensions, names_of_attributes)
+
         detail_columns = None
+        builder = LongFrameBuilder(['Mnemonics', 'Frequency'], None) if self.layout == 'long' else None
         for item in mnemonics_resp.items:
             pivot_resp = item.pivot
             if pivot_resp is None:
                 continue
-            dataset_id = pivot_resp.dataset
-            if dataset_id  not in dict_datasets:
-                dataset = self.client.get_dataset(dataset_id)
-                self.dataset = dataset
-                dimensions = []
-                for dim in dataset.dimensions:
-                    dimensions.append(self.client.get_dimension(dataset_id, dim.id))
-                self.dimensions = dimensions
-                names_of_attributes = self._get_attribute_names() if self.include_metadata else None
-                dict_datasets[dataset_id] = (dataset, dimensions, names_of_attributes)
-            else:
-                self.dataset, self.dimensions, names_of_attributes = dict_datasets[dataset_id]
+            self.dataset, self.dimensions, names_of_attributes = dict_datasets[pivot_resp.dataset]
                     
             # create dataframe with data for mnemonics
-            series = self._get_data_series(pivot_resp, detail_columns)
-            pandas_series = PandasHelper.creates_pandas_series(series, pandas_series, detail_columns)
+            if builder is not None:
+                self._add_long_values(builder, pivot_resp)
+            else:
+                series = self._get_data_series(pivot_resp, detail_columns)
+                pandas_series = PandasHelper.creates_pandas_series(series, pandas_series, detail_columns)
             if self.include_metadata:
                 # create dataframe with metadata for mnemonics
                 series_with_attr = self._get_metadata_series(pivot_resp, names_of_attributes)
                 pandas_series_with_attr = PandasHelper.creates_pandas_series(series_with_attr, pandas_series_with_attr, None)
 
-        pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, [], detail_columns)
+        if builder is not None:
+            pandas_data_frame = builder.get_frame(self.backend)
+        else:
+            pandas_data_frame = PandasHelper.create_pandas_dataframe(pandas_series, [], detail_columns)
         if not self.include_metadata:
             return pandas_data_frame
-        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, [], None)         
-        return pandas_data_frame, pandas_data_frame_with_attr
+        pandas_data_frame_with_attr = PandasHelper.create_pandas_dataframe(pandas_series_with_attr, [], None, sort_index=False)         
+        return pandas_data_frame, _convert_metadata_frame(pandas_data_frame_with_attr, self.backend)
 
     def get_pandasframe(self):
         """The method loads data from dataset"""
@@ -1055,10 +1354,15 @@ class KnoemaSeries(object):
         self.column_values = [] if self.column_count > 0 else None
         for _ in range(0, self.column_count):
             self.column_values.append([])
+        # set of index points is created by the first add_value, so membership check doesn't depend on series length
+        self._index_points = None
 
     def add_value(self, value, index_point, columns=None):
         """The function is addeing new value to provied index. If index does not exist"""
-        if index_point not in self.index:
+        if self._index_points is None:
+            self._index_points = set(self.index)
+        if index_point not in self._index_points:
+            self._index_points.add(index_point)
             self.values.append(value)
             self.index.append(index_point)
             if self.column_count > 0:
@@ -1066,16 +1370,14 @@ class KnoemaSeries(object):
                     self.column_values[i].append(None if columns is None else columns[i])
 
     def creates_pandas_series(self, pandas_series, detail_columns):
-        """The function creates pandas series based on index and values"""
+        """The function adds index and values of the series to the columns of pandas frame"""
         if detail_columns is None:
-            pandas_series[self.name] = pandas.Series(self.values, self.index, name=self.name)
+            pandas_series[self.name] = (self.index, self.values)
         else:
-            series_name = self.name + ('Value',)
-            pandas_series[series_name] = pandas.Series(self.values, self.index, name=series_name)
+            pandas_series[self.name + ('Value',)] = (self.index, self.values)
             for i in range(0, self.column_count):
                 column_name = detail_columns[i]
-                series_name = self.name + (column_name,)
-                pandas_series[series_name] = pandas.Series(self.column_values[i], self.index, name=series_name)
+                pandas_series[self.name + (column_name,)] = (self.index, self.column_values[i])
 
 class PandasHelper(object):
     @staticmethod
@@ -1085,9 +1387,18 @@ class PandasHelper(object):
         return pandas_series
 
     @staticmethod
-    def create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns):
-        pandas_data_frame = pandas.DataFrame(pandas_series)
-        pandas_data_frame.sort_index()
+    def create_pandas_dataframe(pandas_series, names_of_dimensions, detail_columns, sort_index=True):
+        # frames with metadata aren't sorted, so their rows stay in order of attributes
+        pandas_data_frame = PandasHelper._create_numeric_dataframe(pandas_series, sort_index)
+        if pandas_data_frame is None:
+            pandas_data_frame = pandas.DataFrame({name: pandas.Series(values, index, name=name) for name, (index, values) in pandas_series.items()})
+        if sort_index:
+            try:
+                pandas_data_frame = pandas_data_frame.sort_index()
+            except TypeError:
+                # index with labels of different types (e.g. dates and FQ labels) can't be sorted
+                pass
+
         if isinstance(pandas_data_frame.columns, pandas.MultiIndex):
             column_names = names_of_dimensions
             if detail_columns is not None:
@@ -1097,6 +1408,170 @@ class PandasHelper(object):
 
         return pandas_data_frame
 
+    @staticmethod
+    def _create_numeric_dataframe(pandas_series, sort_index=True):
+        """
+        The function creates frame from columns with numeric values by placing all values to one 2-D array,
+        so the index is built once instead of aligning indexes of every column.
+        None is returned for columns which can't be placed this way, e.g. with text values or repeated index points.
+        """
+        if not pandas_series:
+            return None
+
+        indexes = []
+        values = []
+        for index, column_values in pandas_series.values():
+            column_values = numpy.asarray(column_values)
+            if column_values.ndim != 1 or len(column_values) == 0 or column_values.dtype.kind not in 'iuf':
+                return None
+            indexes.append(index)
+            values.append(column_values)
+
+        if all(isinstance(index, pandas.DatetimeIndex) for index in indexes):
+            codes, labels = pandas.factorize(indexes[0].append(indexes[1:]))
+        else:
+            # index points are factorized as they are, so only unique points are converted by pandas
+            points = pandas.Index(list(itertools.chain.from_iterable(indexes)), dtype=object)
+            codes, labels = pandas.factorize(points)
+            labels = pandas.Index(labels.tolist())
+
+        order = None
+        if sort_index:
+            try:
+                order = labels.argsort()
+            except TypeError:
+                pass
+        if order is not None:
+            labels = labels[order]
+            positions = numpy.empty(len(order), dtype=codes.dtype)
+            positions[order] = numpy.arange(len(order))
+            codes = positions[codes]
+
+        row_count = len(labels)
+        column_count = len(values)
+        lengths = [len(column_values) for column_values in values]
+        column_codes = numpy.repeat(numpy.arange(column_count), lengths)
+        cells = codes * column_count + column_codes
+        if len(numpy.unique(cells)) != len(cells):
+            return None
+
+        block = numpy.full((row_count, column_count), numpy.nan)
+        block[codes, column_codes] = numpy.concatenate(values)
+        pandas_data_frame = pandas.DataFrame(block, index=labels, columns=pandas.Index(list(pandas_series.keys())))
+
+        # pandas keeps integer type of columns without missing values
+        start = 0
+        for i, column_values in enumerate(values):
+            end = start + len(column_values)
+            if column_values.dtype.kind in 'iu' and len(column_values) == row_count:
+                pandas_data_frame.isetitem(i, column_values[numpy.argsort(codes[start:end])])
+            start = end
+        return pandas_data_frame
+
+class LongFrameBuilder(object):
+    """
+    The class collects observations of series and creates frame with one row per observation.
+    The frame contains categorical columns with names of dimensions, the columns Date and Value and detail columns.
+    """
+
+    def __init__(self, names_of_dimensions, detail_columns):
+        self.names_of_dimensions = names_of_dimensions
+        self.detail_columns = detail_columns
+        self._series_codes = {}
+        self._codes = []
+        self._lengths = []
+        self._dates = []
+        self._values = []
+        self._column_values = [[] for _ in detail_columns] if detail_columns is not None else None
+        self._points = set()
+
+    def add_values(self, series_name, dates, values, column_values=None):
+        """The method adds observations of the series, dates are list or datetime64 array"""
+        code = self._series_codes.setdefault(series_name, len(self._series_codes))
+        self._codes.append(code)
+        self._lengths.append(len(values))
+        self._dates.append(dates)
+        self._values.append(values)
+        if self._column_values is not None:
+            for i, column in enumerate(self._column_values):
+                column.append(column_values[i] if column_values is not None else [None] * len(values))
+
+    def add_value(self, series_name, date, value, columns=None):
+        """The method adds one observation of the series, repeated observations of the same date are skipped"""
+        # the first value is kept, the same as by KnoemaSeries.add_value for the wide layout
+        point = (series_name, date)
+        if point in self._points:
+            return
+        self._points.add(point)
+        self.add_values(series_name, (date,), (value,), [(column,) for column in columns] if columns is not None else None)
+
+    def get_frame(self, backend='pandas'):
+        """The method creates pandas frame, Arrow table or Polars frame"""
+        if backend == 'pandas':
+            return self.get_pandasframe()
+        return _from_arrow(self.get_arrow_table(), backend)
+
+    def get_pandasframe(self):
+        """The method creates pandas frame"""
+        data = {}
+        for column_name, member_codes, categories in self._get_dimension_columns():
+            data[column_name] = pandas.Categorical.from_codes(member_codes, categories)
+
+        dates = self._get_datetime64_dates()
+        data['Date'] = TimeFormat.to_datetime_index(dates) if dates is not None else list(itertools.chain.from_iterable(self._dates))
+        data['Value'] = list(itertools.chain.from_iterable(self._values))
+        if self._column_values is not None:
+            for column_name, column in zip(self.detail_columns, self._column_values):
+                data[column_name] = list(itertools.chain.from_iterable(column))
+
+        return pandas.DataFrame(data, index=pandas.RangeIndex(sum(self._lengths)))
+
+    def get_arrow_table(self):
+        """The method creates Arrow table, dimension columns are dictionary encoded"""
+        pyarrow = _import_backend('pyarrow')
+
+        names = []
+        arrays = []
+        for column_name, member_codes, categories in self._get_dimension_columns():
+            indices = pyarrow.array(member_codes.astype(numpy.int32), mask=member_codes < 0)
+            names.append(column_name)
+            dictionary = pyarrow.array(categories.tolist(), type=pyarrow.string() if len(categories) == 0 else None)
+            arrays.append(pyarrow.DictionaryArray.from_arrays(indices, dictionary))
+
+        # types of Date and Value don't depend on values, so tables of all parts have the same schema
+        # statistical dates like 2020FQ1 are kept as strings
+        dates = self._get_datetime64_dates()
+        date_type = pyarrow.timestamp('us')
+        if dates is None:
+            dates = list(itertools.chain.from_iterable(self._dates))
+            if not all(isinstance(date, datetime) for date in dates):
+                dates = [_to_string(date) for date in dates]
+                date_type = pyarrow.string()
+        names.append('Date')
+        arrays.append(pyarrow.array(dates, type=date_type))
+        names.append('Value')
+        arrays.append(pyarrow.array(list(itertools.chain.from_iterable(self._values)), type=pyarrow.float64()))
+        if self._column_values is not None:
+            for column_name, column in zip(self.detail_columns, self._column_values):
+                names.append(column_name)
+                arrays.append(pyarrow.array(list(itertools.chain.from_iterable(column))))
+
+        return pyarrow.Table.from_batches([pyarrow.RecordBatch.from_arrays(arrays, names=names)])
+
+    def _get_dimension_columns(self):
+        # members are factorized per series and repeated for observations of the series
+        row_codes = numpy.repeat(numpy.array(self._codes, dtype=numpy.int64), self._lengths)
+        series_names = list(self._series_codes.keys())
+        for i, column_name in enumerate(self.names_of_dimensions):
+            members = [name[i] if i < len(name) else None for name in series_names]
+            member_codes, categories = pandas.factorize(pandas.Index(members))
+            yield column_name, member_codes[row_codes], categories
+
+    def _get_datetime64_dates(self):
+        if self._dates and all(isinstance(dates, (numpy.ndarray, pandas.DatetimeIndex)) for dates in self._dates):
+            return numpy.concatenate([numpy.asarray(dates, dtype='datetime64[us]') for dates in self._dates])
+        return None
+
 class TimeFormat(object):
     @staticmethod
     def format_statistical(date_point, freq):
@@ -1112,6 +1587,78 @@ class TimeFormat(object):
         week_number = iso_values[1]
         return '{}W{}'.format(iso_year, week_number)
 
+    @staticmethod
+    def format_statistical_dates(dates, freq):
+        """The function formats array of datetime64 dates like format_statistical and returns list of labels"""
+        if freq == 'FQ':
+            months = dates.astype('datetime64[M]').astype(numpy.int64)
+            return ['{}FQ{}'.format(month // 12 + 1970, month % 12 // 3 + 1) for month in months.tolist()]
+        if freq == 'W':
+            iso_dates = pandas.DatetimeIndex(dates).isocalendar()
+            return ['{}W{}'.format(year, week) for year, week in zip(iso_dates['year'].tolist(), iso_dates['week'].tolist())]
+        return [TimeFormat.format_statistical(date, freq) for date in dates.astype(datetime)]
+
+    @staticmethod
+    def get_dates(start_date, freq, count):
+        """
+        The function returns datetime64 array of count dates of frequency starting from start_date.
+        Dates are the same as adding delta of the frequency count times, so the day of month
+        once cut to the end of a short month stays cut.
+        """
+        delta = TimeFormat.get_frequencies_delta()[freq]
+        start = numpy.datetime64(start_date, 'us')
+        steps = numpy.arange(count, dtype=numpy.int64)
+        if isinstance(delta, timedelta):
+            return start + steps * numpy.timedelta64(delta, 'us')
+
+        months = numpy.datetime64(start_date, 'M') + steps * (delta.years * 12 + delta.months)
+        days_in_month = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(numpy.int64)
+        days = numpy.minimum.accumulate(numpy.minimum(days_in_month, start_date.day))
+        time_of_day = start - numpy.datetime64(start_date, 'D')
+        return months.astype('datetime64[D]') + (days - 1) + time_of_day
+
+    @staticmethod
+    def get_date_amount(start_date, end_date, freq):
+        """
+        The function returns amount of dates of frequency from start_date to end_date inclusive,
+        the dates are the same as returned by get_dates.
+        """
+        if end_date < start_date:
+            return 0
+
+        delta = TimeFormat.get_frequencies_delta()[freq]
+        if isinstance(delta, timedelta):
+            return (end_date - start_date) // delta + 1
+
+        step = delta.years * 12 + delta.months
+        count = ((end_date.year - start_date.year) * 12 + end_date.month - start_date.month) // step + 1
+
+        # the day of month is cut by the shortest month passed, two years of steps pass every month they ever pass
+        day = start_date.day
+        for i in range(1, min(count, 25)):
+            if day <= 28:
+                break
+            year, month = divmod(start_date.month - 1 + i * step, 12)
+            day = min(day, calendar.monthrange(start_date.year + year, month + 1)[1])
+
+        year, month = divmod(start_date.month - 1 + (count - 1) * step, 12)
+        last_date = start_date.replace(year = start_date.year + year, month = month + 1, day = day)
+        return count if last_date <= end_date else count - 1
+
+    @staticmethod
+    def to_datetime_index(dates):
+        """The function creates index of the same type as pandas creates for list of datetime objects"""
+        return pandas.DatetimeIndex(dates).as_unit(TimeFormat._get_datetime_unit())
+
+    _datetime_unit = None
+
+    @staticmethod
+    def _get_datetime_unit():
+        # pandas 2 keeps datetime objects in nanoseconds, pandas 3 in microseconds
+        if TimeFormat._datetime_unit is None:
+            TimeFormat._datetime_unit = pandas.DatetimeIndex([datetime(2000, 1, 1)]).unit
+        return TimeFormat._datetime_unit
+
     @staticmethod
     def get_frequencies_delta():
         return {
@@ -1,4 +1,5 @@
 import tempfile, os, shutil, string, random
+import numpy
 import pandas as pd
 from abc import ABC, abstractmethod
 import csv
@@ -66,36 +67,9 @@ class FrameTransformerFlat(FrameTransformerBase):
     def __init__(self, frame, dim_columns, date_columns, value_columns):
         super().__init__(frame, dim_columns, date_columns, value_columns)
 
-    def _rows(self, frame):
-        data_rows = []
-        first_data_row = []
-
-        for col in frame.columns:
-            first_data_row.append(col)
-
-        data_rows.append(first_data_row)
-        nan_frame = frame.isnull()
-
-        for i in range(len(frame.values)):
-            frame_row = frame.values[i]
-            nan_frame_row = nan_frame.values[i]
-
-            row = []
-
-            for j in range(len(frame_row)):
-                item = frame_row[j]
-                nan_item = nan_frame_row[j]
-                row.append('' if nan_item else str(item))
-
-            data_rows.append(row)
-
-        return data_rows
-
     def prepare(self, file_wrapper, dataset = None, dataset_name = None):
-        rows = self._rows(self._frame)
-
         file_name = (dataset_name if dataset_name != None else dataset) + '.csv'
-        return file_wrapper.write_single_file(file_name, rows)
+        return file_wrapper.write_single_frame(file_name, self._frame)
 
 class FrameTransformerRegular(FrameTransformerBase):
 
@@ -271,8 +245,19 @@ class FrameTransformerRegular(FrameTransformerBase):
 
         return None
 
+    def _get_frequency(self, frame):
+        freq = None
+        if frame.axes[0].freq == None:
+            freq = self._freq_fetch(pd.infer_freq(frame.axes[0]))
+        else:
+            freq = self._freq_fetch(self._frame.axes[0].freq.name)
+
+        if freq == None:
+            raise ValueError('Wrong frequency.')
+
+        return freq
+
     def _data_sheet(self, frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, series_names):
-        data_rows = []
         first_data_row = []
         for d_n in dimensions:
             first_data_row.append(d_n)
@@ -286,75 +271,51 @@ class FrameTransformerRegular(FrameTransformerBase):
         first_data_row.append('Frequency')
 
         first_data_row.extend(['Date', 'Value'])
-        data_rows.append(first_data_row)
-
-        for name in series_names:
-            series = frame[name]
-            nan_series = series.isnull()
-            for ind in range(len(frame.index)):
-                row = []
-
-                if len(dimensions) == 1:
-                    map = dimensions_map[dimensions[0]]
-                    row.append(map[name])
-
-                    freq = None
-                    if frame.axes[0].freq == None:
-                        freq = self._freq_fetch(pd.infer_freq(frame.axes[0]))
-                    else:
-                        freq = self._freq_fetch(self._frame.axes[0].freq.name)
-
-                    if freq == None:
-                        raise ValueError('Wrong frequency.')
-
-                    row.append(freq)
-                else:
-                    for part_ind in range(len(name)):
-                        if scale_index >= 0 and part_ind == scale_index:
-                            continue
-
-                        if unit_index >= 0 and part_ind == unit_index:
-                            continue
-
-                        if freq_index >= 0 and part_ind == freq_index:
-                            continue
-                            
-                        part = name[part_ind]
-
-                        dim_name = frame.columns.names[part_ind]
-                        if dim_name in dimensions_map:
-                            map = dimensions_map[dim_name]
-                            part = map[part]
 
-                        row.append(part)
+        return first_data_row, self._data_frames(frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, series_names)
 
-                    if scale_index >= 0:
-                        row.append(name[scale_index])
+    def _data_frames(self, frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, series_names, chunk_size = 100000):
+        # rows of every series are written one after another, the columns of rows are computed per series
+        # and repeated for every date, frames are yielded by blocks of series of about chunk_size rows
+        if len(series_names) == 0 or len(frame.index) == 0:
+            return
 
-                    if unit_index >= 0:
-                        row.append(name[unit_index])
-
-                    if freq_index >= 0:
-                        row.append(name[freq_index])
-
-                    if freq_index == -1:
-                        freq = None
-                        if frame.axes[0].freq == None:
-                            freq = self._freq_fetch(pd.infer_freq(frame.axes[0]))
-                        else:
-                            freq = self._freq_fetch(self._frame.axes[0].freq.name)
-
-                        if freq == None:
-                            raise ValueError('Wrong frequency.')
-
-                        row.append(freq)
-
-                row.append(frame.index[ind])
-                row.append(series[ind] if not nan_series[ind] else '')
-
-                data_rows.append(row)
+        series_columns = []
+        if len(dimensions) == 1:
+            map = dimensions_map[dimensions[0]]
+            series_columns.append([map[name] for name in series_names])
+            series_columns.append([self._get_frequency(frame)] * len(series_names))
+        else:
+            for part_ind in range(frame.columns.nlevels):
+                if part_ind in (scale_index, unit_index, freq_index):
+                    continue
 
-        return data_rows
+                parts = frame.columns.get_level_values(part_ind)
+                dim_name = frame.columns.names[part_ind]
+                if dim_name in dimensions_map:
+                    parts = parts.map(dimensions_map[dim_name])
+                series_columns.append(list(parts))
+
+            for part_ind in (scale_index, unit_index, freq_index):
+                if part_ind >= 0:
+                    series_columns.append(list(frame.columns.get_level_values(part_ind)))
+
+            if freq_index == -1:
+                series_columns.append([self._get_frequency(frame)] * len(series_names))
+
+        dates = frame.index.to_numpy()
+        # values are taken column by column, so integer series are not converted to float by series of other types
+        values = [frame.iloc[:, i].to_numpy() for i in range(len(frame.columns))]
+        series_per_chunk = max(chunk_size // len(dates), 1)
+        for start in range(0, len(series_names), series_per_chunk):
+            end = min(start + series_per_chunk, len(series_names))
+            columns = [numpy.repeat(numpy.array(column[start:end], dtype = object), len(dates)) for column in series_columns]
+            columns.append(numpy.tile(dates, end - start))
+            block = values[start:end]
+            if any(column.dtype != block[0].dtype for column in block):
+                block = [column.astype(object) for column in block]
+            columns.append(numpy.concatenate(block))
+            yield pd.DataFrame(dict(enumerate(columns)))
 
     def prepare(self, file_wrapper, dataset = None, dataset_name = None):
         frame = self._prepare_frame()
@@ -366,12 +327,12 @@ class FrameTransformerRegular(FrameTransformerBase):
         series_names = frame.columns.values
         dimensions_rows, dimensions_map = self._dimension_sheets(dimensions, series_names)
 
-        data_rows = self._data_sheet(frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, series_names)
+        data_header, data_frames = self._data_sheet(frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, series_names)
 
         file_wrapper.add_to_archive('Dataset.csv', dataset_rows)
         for dim in dimensions_rows:
             file_wrapper.add_to_archive('{}.csv'.format(dim), dimensions_rows[dim])
-        file_wrapper.add_to_archive('Data.csv', data_rows)
+        file_wrapper.add_frames_to_archive('Data.csv', data_header, data_frames)
 
         return file_wrapper.get_archive()
 
@@ -388,12 +349,25 @@ class FileLayerWrapper(object):
         self._tmp_file = os.path.join(parent_folder, name)
         return self._tmp_file
 
+    def write_single_frame(self, name, frame):
+        parent_folder = tempfile.gettempdir()
+        self._write_frame(parent_folder, name, frame)
+
+        self._tmp_file = os.path.join(parent_folder, name)
+        return self._tmp_file
+
     def add_to_archive(self, name, rows):
         if self._tmp_dir == None:
             self._create_tmp_dir()
 
         self._write_file(self._tmp_dir, name, rows)
 
+    def add_frames_to_archive(self, name, header, frames):
+        if self._tmp_dir == None:
+            self._create_tmp_dir()
+
+        self._write_frames(self._tmp_dir, name, header, frames)
+
     def get_archive(self):
 
         shutil.make_archive(self._tmp_dir, 'zip', self._tmp_dir)
@@ -417,6 +391,29 @@ class FileLayerWrapper(object):
             writer = csv.writer(file)
             writer.writerows(rows)
 
+    def _write_frame(self, path, name, frame):
+        with open(os.path.join(path, name), 'w', newline = '') as file:
+            self._frame_to_csv(file, frame, True)
+
+    def _write_frames(self, path, name, header, frames):
+        with open(os.path.join(path, name), 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for frame in frames:
+                self._frame_to_csv(file, frame, False)
+
+    def _frame_to_csv(self, file, frame, header, chunk_size = 100000):
+        # the frame is written by chunks of rows without index, empty cells are written as empty strings
+        # and timestamps as their str with time zone and fractions of seconds, the same as rows written by csv.writer
+        date_columns = [i for i, dtype in enumerate(frame.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)]
+        for start in range(0, max(len(frame.index), 1), chunk_size):
+            chunk = frame.iloc[start:start + chunk_size]
+            if date_columns:
+                chunk = chunk.copy()
+                for i in date_columns:
+                    chunk.isetitem(i, pd.Series([None if pd.isna(date) else str(date) for date in chunk.iloc[:, i].tolist()], index = chunk.index, dtype = object))
+            chunk.to_csv(file, header = header and start == 0, index = False, na_rep = '', lineterminator = '\r\n')
+
     def __enter__(self):
         return self
 
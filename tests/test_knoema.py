@@ -1,6 +1,7 @@
 """This is test module for knoema client with test credentials"""
 
 import unittest
+import importlib.util
 import knoema
 import pandas
 
@@ -579,3 +580,81 @@ class TestKnoemaClient(unittest.TestCase):
         frame = knoema.get('xmhdwqf', company='UBER', indicator='Annual', frequency='M', timerange='2018-2020')
         self.assertEqual(frame.shape[0], 0)
         self.assertEqual(frame.shape[1], 0)
+
+    def test_getdata_long_layout(self):
+        """The method is testing getting data in long layout"""
+
+        data_frame = knoema.get('xmhdwqf', layout='long', company='c1;c2', indicator='ind_m;ind_a')
+
+        self.assertEqual(['Company', 'Indicator', 'Frequency', 'Date', 'Value'], list(data_frame.columns))
+        self.assertIsInstance(data_frame['Company'].dtype, pandas.CategoricalDtype)
+        self.assertIsInstance(data_frame['Frequency'].dtype, pandas.CategoricalDtype)
+        self.assertTrue(pandas.api.types.is_datetime64_any_dtype(data_frame['Date']))
+        self.assertTrue(pandas.api.types.is_float_dtype(data_frame['Value']))
+
+    def test_getdata_long_layout_equals_wide(self):
+        """The method is testing that long layout contains the same observations as wide layout"""
+
+        wide_frame = knoema.get('xmhdwqf', company='c1;c2', indicator='ind_m;ind_a')
+        long_frame = knoema.get('xmhdwqf', layout='long', company='c1;c2', indicator='ind_m;ind_a')
+
+        self.assertEqual(wide_frame.count().sum(), long_frame.shape[0])
+        for row in long_frame.itertuples(index=False):
+            sname = (row.Company, row.Indicator, row.Frequency)
+            self.assertEqual(wide_frame.at[row.Date, sname], row.Value)
+
+    def test_getdata_wide_layout_with_arrow_backend(self):
+        """The method is testing that wide layout is supported only by pandas backend"""
+
+        with self.assertRaises(ValueError) as context:
+            knoema.get('xmhdwqf', layout='wide', backend='arrow', company='c1', indicator='ind_a')
+        self.assertEqual('Wide layout is supported only by pandas backend', str(context.exception))
+
+    @unittest.skipIf(importlib.util.find_spec('pyarrow') is None, 'pyarrow is not installed')
+    def test_getdata_arrow_backend(self):
+        """The method is testing getting data as Arrow table"""
+
+        import pyarrow
+
+        long_frame = knoema.get('xmhdwqf', layout='long', company='c1;c2', indicator='ind_m;ind_a')
+        table = knoema.get('xmhdwqf', backend='arrow', company='c1;c2', indicator='ind_m;ind_a')
+
+        self.assertIsInstance(table, pyarrow.Table)
+        self.assertEqual(list(long_frame.columns), table.column_names)
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field('Company').type))
+        self.assertTrue(pyarrow.types.is_timestamp(table.schema.field('Date').type))
+        self.assertEqual(long_frame['Value'].tolist(), table.column('Value').to_pylist())
+
+    @unittest.skipIf(importlib.util.find_spec('polars') is None, 'polars is not installed')
+    def test_getdata_polars_backend(self):
+        """The method is testing getting data as Polars frame"""
+
+        import polars
+
+        long_frame = knoema.get('xmhdwqf', layout='long', company='c1;c2', indicator='ind_m;ind_a')
+        data_frame = knoema.get('xmhdwqf', backend='polars', company='c1;c2', indicator='ind_m;ind_a')
+
+        self.assertIsInstance(data_frame, polars.DataFrame)
+        self.assertEqual(list(long_frame.columns), data_frame.columns)
+        self.assertEqual(long_frame['Value'].tolist(), data_frame['Value'].to_list())
+
+    def test_iter_get_equals_get(self):
+        """The method is testing that frames yielded by iter_get contain the same data as get"""
+
+        data_frame = knoema.get('xmhdwqf', company='c1;c2', indicator='ind_m;ind_a')
+        frames = list(knoema.iter_get('xmhdwqf', series_per_frame=1, company='c1;c2', indicator='ind_m;ind_a'))
+
+        self.assertEqual(len(frames), 4)
+        iter_frame = pandas.concat(frames, axis=1).sort_index()
+        pandas.testing.assert_frame_equal(iter_frame[data_frame.columns], data_frame, check_freq=False)
+
+    def test_iter_get_long_layout_equals_get(self):
+        """The method is testing that frames of long layout yielded by iter_get contain the same rows as get"""
+
+        data_frame = knoema.get('xmhdwqf', layout='long', company='c1;c2', indicator='ind_m;ind_a')
+        frames = list(knoema.iter_get('xmhdwqf', layout='long', series_per_frame=1, company='c1;c2', indicator='ind_m;ind_a'))
+
+        iter_frame = pandas.concat(frames, ignore_index=True)
+        self.assertEqual(data_frame.shape, iter_frame.shape)
+        for column in data_frame.columns:
+            self.assertEqual(data_frame[column].astype(object).tolist(), iter_frame[column].astype(object).tolist())
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import time
+
+from knoema.api_client_async import AsyncApiClient
+
+
+class _CountingClient(object):
+
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+
+    def __init__(self, name):
+        self.name = name
+
+    def _count(self, key, step):
+        self.in_flight[key] = self.in_flight.get(key, 0) + step
+        self.peak[key] = max(self.peak.get(key, 0), self.in_flight[key])
+
+    def get_dataset(self, datasetid):
+        with self.lock:
+            self._count(self.name, 1)
+            self._count('total', 1)
+        time.sleep(0.02)
+        with self.lock:
+            self._count(self.name, -1)
+            self._count('total', -1)
+        return datasetid
+
+
+def test_clients_with_different_bounds_keep_their_bounds():
+
+    async def load():
+        first = AsyncApiClient(_CountingClient('first'), max_concurrency=2)
+        second = AsyncApiClient(_CountingClient('second'), max_concurrency=3)
+        return await asyncio.gather(*[client.get_dataset(i) for i in range(10) for client in (first, second)])
+
+    # the second run checks that pools are not rebuilt when bounds alternate
+    for _ in range(2):
+        assert len(asyncio.run(load())) == 20
+
+    assert _CountingClient.peak['first'] == 2
+    assert _CountingClient.peak['second'] == 3
+    assert _CountingClient.peak['total'] <= 5
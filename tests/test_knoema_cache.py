@@ -0,0 +1,118 @@
+from unittest import mock
+
+from knoema.api_cache import MetadataCache, PersistentMetadataCache
+from knoema.api_client import ApiClient
+
+
+def _dataset_json(path):
+    return {'id': 'PRIVATE', 'name': 'Private dataset', 'type': 'Regular', 'dimensions': [], 'lastUpdatedOn': '2020-01-01T00:00:00'}
+
+
+def _load_dataset(client):
+    with mock.patch.object(client, '_api_get_json', side_effect=_dataset_json) as get_json:
+        client.get_dataset_meta('PRIVATE')
+    return get_json.call_count
+
+
+def test_persistent_cache_is_not_shared_between_credentials(tmp_path):
+    owner = ApiClient('knoema.com', 'owner', 'secret', persistent_cache_dir=str(tmp_path))
+    assert _load_dataset(owner) == 1
+    assert _load_dataset(ApiClient('knoema.com', 'owner', 'secret', persistent_cache_dir=str(tmp_path))) == 0
+
+    assert _load_dataset(ApiClient('knoema.com', 'other', 'secret', persistent_cache_dir=str(tmp_path))) == 1
+    assert _load_dataset(ApiClient('knoema.com', 'owner', 'wrong', persistent_cache_dir=str(tmp_path))) == 1
+    assert _load_dataset(ApiClient('knoema.com', persistent_cache_dir=str(tmp_path))) == 1
+
+
+def test_memory_cache_entries_expire_after_ttl():
+    cache = MetadataCache(max_size=10, ttl=60)
+    with mock.patch('knoema.api_cache.time.monotonic', return_value=1000):
+        cache.put(('dataset', 'A'), 'a')
+    with mock.patch('knoema.api_cache.time.monotonic', return_value=1060):
+        assert cache.get(('dataset', 'A')) == 'a'
+    with mock.patch('knoema.api_cache.time.monotonic', return_value=1061):
+        assert cache.get(('dataset', 'A')) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MetadataCache(max_size=2, ttl=None)
+    cache.put(('dataset', 'A'), 'a')
+    cache.put(('dataset', 'B'), 'b')
+    assert cache.get(('dataset', 'A')) == 'a'
+
+    cache.put(('dataset', 'C'), 'c')
+
+    assert cache.get(('dataset', 'B')) is None
+    assert cache.get(('dataset', 'A')) == 'a'
+    assert cache.get(('dataset', 'C')) == 'c'
+
+
+def test_memory_cache_of_zero_size_keeps_nothing():
+    cache = MetadataCache(max_size=0)
+    assert cache.get_or_load(('dataset', 'A'), lambda: 'a') == 'a'
+    assert len(cache) == 0
+
+
+def test_memory_cache_loads_once_and_invalidates_dataset():
+    cache = MetadataCache()
+    load = mock.Mock(return_value='dimension')
+    assert cache.get_or_load(('dimension', 'A', 'country'), load) == 'dimension'
+    assert cache.get_or_load(('dimension', 'A', 'country'), load) == 'dimension'
+    load.assert_called_once_with()
+
+    cache.put(('dataset', 'B'), 'b')
+    cache.invalidate('A')
+    assert cache.get(('dimension', 'A', 'country')) is None
+    assert cache.get(('dataset', 'B')) == 'b'
+
+
+def test_persistent_cache_is_shared_between_instances(tmp_path):
+    PersistentMetadataCache(str(tmp_path)).put('A', '/api/1.0/meta/dataset/A/dimension/country', {'items': [1, 2]})
+
+    cache = PersistentMetadataCache(str(tmp_path))
+    assert cache.get('/api/1.0/meta/dataset/A/dimension/country') == {'items': [1, 2]}
+    assert cache.get('/api/1.0/meta/dataset/B') is None
+
+
+def test_persistent_cache_drops_entries_of_updated_dataset(tmp_path):
+    cache = PersistentMetadataCache(str(tmp_path), ttl=60)
+    cache.validate('A', 'v1')
+    cache.put('A', '/a', {'version': 1})
+    cache.put('B', '/b', {'version': 1})
+
+    other = PersistentMetadataCache(str(tmp_path), ttl=60)
+    assert other.is_valid('A')
+    other.validate('A', 'v1')
+    assert other.get('/a') == {'version': 1}
+
+    other.validate('A', 'v2')
+    assert cache.get('/a') is None
+    assert cache.get('/b') == {'version': 1}
+
+
+def test_persistent_cache_checks_dataset_after_ttl(tmp_path):
+    cache = PersistentMetadataCache(str(tmp_path), ttl=60)
+    assert not cache.is_valid('A')
+    with mock.patch('knoema.api_cache.time.time', return_value=1000):
+        cache.validate('A', 'v1')
+    with mock.patch('knoema.api_cache.time.time', return_value=1060):
+        assert cache.is_valid('A')
+    with mock.patch('knoema.api_cache.time.time', return_value=1061):
+        assert not cache.is_valid('A')
+
+
+def test_persistent_cache_invalidates_datasets(tmp_path):
+    cache = PersistentMetadataCache(str(tmp_path))
+    cache.validate('A', 'v1')
+    cache.put('A', '/a', {})
+    cache.put('B', '/b', {})
+
+    cache.invalidate('A')
+    assert not cache.is_valid('A')
+    assert cache.get('/a') is None
+    assert cache.get('/b') == {}
+
+    cache.invalidate()
+    assert cache.get('/b') is None
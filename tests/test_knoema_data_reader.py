@@ -0,0 +1,345 @@
+import copy
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy
+import pandas
+import pytest
+
+import knoema.api_definitions as definition
+from knoema.data_reader import StreamingDataReader, TimeFormat, TransformationDataReader
+
+_frequencies = ['A', 'H', 'Q', 'FQ', 'M', 'W', 'D']
+
+# month ends, leap days and the time of day are kept or cut by adding the delta of the frequency
+_start_dates = [
+    datetime(2019, 1, 31), datetime(2019, 8, 31), datetime(2019, 11, 30), datetime(2020, 2, 29),
+    datetime(2020, 1, 29), datetime(2023, 3, 31), datetime(2000, 1, 1, 12, 30), datetime(1999, 12, 31),
+]
+
+
+def _stepped_dates(start_date, freq, count):
+    delta = TimeFormat.get_frequencies_delta()[freq]
+    dates = [start_date]
+    while len(dates) < count:
+        dates.append(dates[-1] + delta)
+    return dates[:count]
+
+
+def _stepped_amount(start_date, end_date, freq):
+    delta = TimeFormat.get_frequencies_delta()[freq]
+    count = 0
+    date = start_date
+    while date <= end_date:
+        date += delta
+        count += 1
+    return count
+
+
+def _flat_dataset():
+    return definition.Dataset({
+        'id': 'FLAT',
+        'type': 'Flat',
+        'dimensions': [
+            {'key': 1, 'id': 'country', 'name': 'Country'},
+            {'key': 2, 'id': 'indicator', 'name': 'Indicator'},
+        ],
+        'columns': [],
+    })
+
+
+def _dimension(dim_id, member_ids, members_without_data=()):
+    items = [{'key': i, 'name': 'Member {}'.format(member_id), 'level': 0, 'hasData': member_id not in members_without_data,
+              'fields': {'id': member_id}} for i, member_id in enumerate(member_ids)]
+    return definition.Dimension({'key': 0, 'id': dim_id, 'name': dim_id.title(), 'fields': [], 'items': items})
+
+
+def _plan(dimensions=None, rows_per_request=100000, **dim_values):
+    client = mock.Mock()
+    if dimensions is None:
+        client.get_dimensions.side_effect = AssertionError('dimensions should not be loaded')
+    else:
+        client.get_dimensions.side_effect = lambda dataset, ids: [dimensions[dim_id] for dim_id in ids]
+    reader = TransformationDataReader(client, dim_values, None, None)
+    reader.dataset = _flat_dataset()
+    reader.detail_members_per_request = 3
+    reader.detail_rows_per_request = rows_per_request
+    # the separator is passed with every request, so it is left out of comparisons
+    return [{name: value for name, value in request.filters.items() if name != 'separator'} for request in reader.plan_requests()]
+
+
+_small_indicator = {'indicator': _dimension('indicator', ['x'])}
+
+
+def test_small_selection_is_one_request():
+    assert _plan(country='a;b;c', indicator='x') == [{'country': 'a;b;c', 'indicator': 'x'}]
+
+
+def test_small_request_without_selection_is_one_request():
+    dimensions = {'country': _dimension('country', ['a', 'b']), 'indicator': _dimension('indicator', ['x', 'y', 'z'])}
+    assert _plan(dimensions) == [{}]
+
+
+def test_request_without_selection_is_split_by_members_with_data():
+    dimensions = {'country': _dimension('country', ['a', 'b']), 'indicator': _dimension('indicator', ['x1', 'x2', 'x3', 'x4', 'x5'], ['x3'])}
+    assert _plan(dimensions) == [{'indicator': 'x1;x2'}, {'indicator': 'x4;x5'}]
+
+
+def test_request_is_split_by_estimated_rows():
+    dimensions = {'indicator': _dimension('indicator', ['x1', 'x2', 'x3'])}
+    # 2 countries by 3 indicators are 6 rows, so parts of 2 rows have one indicator
+    assert _plan(dimensions, rows_per_request=2, country='a;b') == [
+        {'country': 'a;b', 'indicator': 'x1'},
+        {'country': 'a;b', 'indicator': 'x2'},
+        {'country': 'a;b', 'indicator': 'x3'},
+    ]
+    assert _plan(dimensions, rows_per_request=6, country='a;b') == [{'country': 'a;b'}]
+
+
+def test_largest_selection_is_split():
+    assert _plan(country='a;b', indicator='x1;x2;x3;x4;x5;x6;x7') == [
+        {'country': 'a;b', 'indicator': 'x1;x2;x3'},
+        {'country': 'a;b', 'indicator': 'x4;x5;x6'},
+        {'country': 'a;b', 'indicator': 'x7'},
+    ]
+
+
+def test_repeated_members_are_requested_once():
+    assert _plan(_small_indicator, country='a;b;a;c;b') == [{'country': 'a;b;a;c;b'}]
+    assert _plan(_small_indicator, country='a;b;a;c;d;b') == [{'country': 'a;b'}, {'country': 'c;d'}]
+
+
+def test_selection_with_aggregation_is_not_split():
+    assert _plan(_small_indicator, country='@SUM;a;b;c;d;e') == [{'country': '@SUM;a;b;c;d;e'}]
+
+
+@pytest.mark.parametrize('indicator, parts', [('x1;x2;x3;x4', ['x1;x2', 'x3;x4']), ('x1;x2;x3;x4;x5', ['x1;x2;x3', 'x4;x5'])])
+def test_selection_with_aggregation_keeps_other_dimension_split(indicator, parts):
+    plan = _plan(country='@SUM;a;b;c;d', indicator=indicator)
+    assert all(filters['country'] == '@SUM;a;b;c;d' for filters in plan)
+    assert [filters['indicator'] for filters in plan] == parts
+
+
+@pytest.mark.parametrize('freq', _frequencies)
+@pytest.mark.parametrize('start_date', _start_dates)
+def test_get_dates_equal_stepped_dates(start_date, freq):
+    expected = numpy.array(_stepped_dates(start_date, freq, 60), dtype='datetime64[us]')
+    assert (TimeFormat.get_dates(start_date, freq, 60) == expected).all()
+
+
+@pytest.mark.parametrize('freq', _frequencies)
+def test_get_dates_of_no_points(freq):
+    assert len(TimeFormat.get_dates(datetime(2020, 2, 29), freq, 0)) == 0
+
+
+@pytest.mark.parametrize('freq', _frequencies)
+@pytest.mark.parametrize('start_date', _start_dates)
+def test_get_date_amount_equals_stepped_amount(start_date, freq):
+    # end dates fall on the stepped dates, one day before and after them
+    for date in _stepped_dates(start_date, freq, 40)[::3]:
+        for end_date in [date - timedelta(days=1), date, date + timedelta(days=1)]:
+            assert TimeFormat.get_date_amount(start_date, end_date, freq) == _stepped_amount(start_date, end_date, freq)
+
+
+@pytest.mark.parametrize('freq', _frequencies)
+def test_get_date_amount_before_start(freq):
+    assert TimeFormat.get_date_amount(datetime(2020, 3, 1), datetime(2020, 2, 29), freq) == 0
+
+
+def test_time_point_amount_of_weeks_and_fiscal_quarters():
+    reader = StreamingDataReader(None, {})
+
+    # weekly dates are moved to mondays
+    assert reader._get_time_point_amount('2020-01-01T00:00:00Z', '2020-01-06T00:00:00Z', 'W') == 2
+    assert reader._get_time_point_amount('2020-01-01T00:00:00', '2020-12-31T00:00:00', 'FQ') == 4 + 10
+
+
+def _grouped_dataset():
+    return definition.Dataset({
+        'id': 'REGULAR',
+        'type': 'Regular',
+        'dimensions': [
+            {'key': 1, 'id': 'country', 'name': 'Country'},
+            {'key': 2, 'id': 'indicator', 'name': 'Indicator'},
+        ],
+    })
+
+
+def _series_metadata(country, indicator, start='2000-01-01T00:00:00Z', end='2009-01-01T00:00:00Z', freq='A'):
+    return {'country': {'key': country}, 'indicator': {'key': indicator}, 'startDate': start, 'endDate': end, 'frequency': freq}
+
+
+def _baseline_chunks(reader, metadata):
+    # parts are grown series by series and the product of members is computed again for every series
+    chunks = []
+    offset = 0
+    while offset < len(metadata):
+        time_points = 0
+        members = {}
+        index = offset
+        for i in range(offset, len(metadata)):
+            series = metadata[i]
+            time_points = max(time_points, reader._get_time_point_amount(series['startDate'], series['endDate'], series['frequency']))
+            points = time_points
+            member_count = 0
+            for dim in reader.dataset.dimensions:
+                dim_members = members.setdefault(dim.id, [])
+                if str(series[dim.id]['key']) not in dim_members:
+                    dim_members.append(str(series[dim.id]['key']))
+                points *= len(dim_members)
+                member_count += len(dim_members)
+            if points >= reader.chunk_point_limit or member_count >= reader.chunk_member_limit:
+                break
+            index = i
+        end = min(index + 1, len(metadata))
+        chunks.append((offset, end))
+        offset = end
+    return chunks
+
+
+def _chunk_reader(point_limit, member_limit):
+    reader = StreamingDataReader(None, {})
+    reader.dataset = _grouped_dataset()
+    reader.chunk_point_limit = point_limit
+    reader.chunk_member_limit = member_limit
+    return reader
+
+
+@pytest.mark.parametrize('point_limit, member_limit', [(100, 200), (50, 200), (1000, 7), (10, 3), (1, 200), (10 ** 6, 10 ** 6)])
+def test_plan_chunks_equal_baseline(point_limit, member_limit):
+    reader = _chunk_reader(point_limit, member_limit)
+    metadata = [_series_metadata(country, indicator) for country, indicator in itertools.product(range(6), range(5))]
+    metadata += [_series_metadata(9, 1, '2000-01-31T00:00:00Z', '2002-02-28T00:00:00Z', 'M'), _series_metadata(9, 2, freq='Q')]
+
+    expected = _baseline_chunks(reader, copy.deepcopy(metadata))
+    chunks = reader.plan_chunks(metadata)
+
+    assert chunks == expected
+    assert [start for start, _ in chunks] == [0] + [end for _, end in chunks[:-1]]
+    assert chunks[-1][1] == len(metadata)
+
+
+def test_series_over_limit_is_part_alone():
+    reader = _chunk_reader(100, 200)
+    metadata = [_series_metadata(1, 1), _series_metadata(2, 1, '1900-01-01T00:00:00Z'), _series_metadata(3, 1)]
+
+    assert reader.plan_chunks(metadata) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_plan_chunks_of_no_series():
+    assert _chunk_reader(100, 200).plan_chunks([]) == []
+
+
+def test_plan_chunks_requires_all_dimensions():
+    metadata = [{'country': {'key': 1}, 'startDate': '2000-01-01T00:00:00Z', 'endDate': '2001-01-01T00:00:00Z', 'frequency': 'A'}]
+    with pytest.raises(ValueError):
+        _chunk_reader(100, 200).plan_chunks(metadata)
+
+
+class _RawDataClient(object):
+    """Fake client which returns raw data of the requested members and records the amount of concurrent requests"""
+
+    def __init__(self, series, delay=0.02):
+        self.series = series
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get_dimensions(self, dataset_id, dimension_ids):
+        return [_dimension(dim_id, [str(i) for i in range(10)]) for dim_id in dimension_ids]
+
+    def get_data_raw(self, pivot_req):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        members = {item.dimensionid: set(item.members) for item in pivot_req.stub}
+        data = [copy.deepcopy(series) for series in self.series
+                if series['country']['key'] in members['country'] and series['indicator']['key'] in members['indicator']]
+        with self._lock:
+            self.in_flight -= 1
+        return definition.RawDataResponse({'continuationToken': None, 'data': data})
+
+
+def _member(key):
+    return {'key': key, 'name': 'Member {}'.format(key)}
+
+
+def _raw_series(country, indicator):
+    return {'country': _member(country), 'indicator': _member(indicator), 'frequency': 'A',
+            'startDate': '2000-01-01T00:00:00Z', 'values': [country * 10 + indicator, None, country + indicator / 10]}
+
+
+def _grouped_frames(client, metadata, max_chunks_in_flight, chunks=None):
+    reader = StreamingDataReader(client, {}, group_by='country', max_chunks_in_flight=max_chunks_in_flight)
+    reader.dataset = _grouped_dataset()
+    reader.chunk_member_limit = 4
+    if chunks is not None:
+        reader.plan_chunks = lambda metadata: chunks
+    return [(frame.id, frame.data) for frame in reader.get_pandasframe_by_metadata_grouped(metadata, None, None)]
+
+
+def _grouped_metadata(pairs):
+    return [dict(_series_metadata(country, indicator, end='2002-01-01T00:00:00Z'), country=_member(country), indicator=_member(indicator))
+            for country, indicator in pairs]
+
+
+@pytest.mark.parametrize('max_chunks_in_flight', [2, 3, 4])
+def test_concurrent_parts_equal_sequential_loading(max_chunks_in_flight):
+    pairs = [(country, indicator) for country in range(6) for indicator in range(3)]
+    metadata = _grouped_metadata(pairs)
+
+    expected = _grouped_frames(_RawDataClient([_raw_series(*pair) for pair in pairs]), metadata, 1)
+    client = _RawDataClient([_raw_series(*pair) for pair in pairs])
+    frames = _grouped_frames(client, metadata, max_chunks_in_flight)
+
+    assert [name for name, _ in frames] == [name for name, _ in expected] == ['Member {}'.format(i) for i in range(6)]
+    for (_, frame), (_, expected_frame) in zip(frames, expected):
+        pandas.testing.assert_frame_equal(frame, expected_frame)
+    assert client.requests > max_chunks_in_flight
+    assert 1 < client.max_in_flight <= max_chunks_in_flight
+
+
+@pytest.mark.parametrize('max_chunks_in_flight', [1, 2, 3])
+def test_parts_are_not_loaded_ahead_more_than_limit(max_chunks_in_flight):
+    reader = StreamingDataReader(None, {}, max_chunks_in_flight=max_chunks_in_flight)
+    started = []
+
+    def load(request):
+        started.append(request)
+        return request
+
+    consumed = []
+    for part in reader._load_parts(load, list(range(10))):
+        # the consumer is slow, so all parts which may be loaded ahead are started
+        time.sleep(0.02)
+        assert len(started) <= len(consumed) + max_chunks_in_flight
+        consumed.append(part)
+
+    assert consumed == list(range(10))
+
+
+@pytest.mark.parametrize('max_chunks_in_flight', [1, 3])
+def test_group_spread_across_parts_is_yielded_once_complete(max_chunks_in_flight):
+    # group 3 is complete in the first part, groups 2 and 1 are completed by the second part
+    # and are yielded in order of their first series
+    pairs = [(2, 0), (1, 0), (3, 0), (1, 1), (2, 1), (2, 2)]
+    client = _RawDataClient([_raw_series(*pair) for pair in pairs])
+
+    frames = _grouped_frames(client, _grouped_metadata(pairs), max_chunks_in_flight, chunks=[(0, 3), (3, 6)])
+
+    assert [name for name, _ in frames] == ['Member 3', 'Member 2', 'Member 1']
+    for name, frame in frames:
+        country = int(name.split()[1])
+        expected_columns = {('Member {}'.format(c), 'Member {}'.format(i), 'A') for c, i in pairs if c == country}
+        assert set(frame.columns) == expected_columns
+        for _, indicator, _ in frame.columns:
+            values = frame[(name, indicator, 'A')].dropna().tolist()
+            indicator = int(indicator.split()[1])
+            assert values == [country * 10 + indicator, country + indicator / 10]
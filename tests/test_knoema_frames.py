@@ -0,0 +1,154 @@
+import datetime
+from unittest import mock
+
+import numpy
+import pandas
+import pytest
+
+import knoema
+import knoema.api_definitions as definition
+from knoema.data_reader import DetailsResponseReader, LongFrameBuilder, _convert_metadata_frame
+
+
+def _dates(*dates):
+    return numpy.array(dates, dtype='datetime64[D]')
+
+
+def test_arrow_schema_does_not_depend_on_values():
+    pytest.importorskip('pyarrow')
+
+    int_only = LongFrameBuilder(['Country'], None)
+    int_only.add_values(('914',), _dates('2020-01-01', '2021-01-01'), [1, 2])
+
+    nan_only = LongFrameBuilder(['Country'], None)
+    nan_only.add_values(('512',), _dates('2020-01-01'), [numpy.nan])
+
+    missing = LongFrameBuilder(['Country'], None)
+    missing.add_value(('512',), datetime.datetime(2020, 1, 1), None)
+
+    schema = int_only.get_arrow_table().schema
+    assert nan_only.get_arrow_table().schema == schema
+    assert missing.get_arrow_table().schema == schema
+    assert LongFrameBuilder(['Country'], None).get_arrow_table().schema == schema
+    assert str(schema.field('Value').type) == 'double'
+    assert str(schema.field('Date').type) == 'timestamp[us]'
+
+
+def _metadata_frame():
+    columns = pandas.MultiIndex.from_tuples([('914', 'NGDP'), ('512', 'LP')], names=['Country', 'Subject'])
+    return pandas.DataFrame([['USD', 1], [None, 'Units']], index=['Unit', 'Scale'], columns=columns, dtype=object)
+
+
+def test_metadata_with_mixed_attribute_types_to_arrow():
+    pytest.importorskip('pyarrow')
+
+    table = _convert_metadata_frame(_metadata_frame(), 'arrow')
+
+    assert table.column_names == ['Country', 'Subject', 'Unit', 'Scale']
+    assert table.column('Unit').to_pylist() == ['USD', '1']
+    assert table.column('Scale').to_pylist() == [None, 'Units']
+
+
+def test_metadata_with_mixed_attribute_types_to_polars():
+    pytest.importorskip('polars')
+
+    frame = _convert_metadata_frame(_metadata_frame(), 'polars')
+
+    assert frame['Unit'].to_list() == ['USD', '1']
+    assert frame['Scale'].to_list() == [None, 'Units']
+
+
+@pytest.mark.parametrize('series_per_frame', [0, -1, 2.5, '10', True])
+def test_iter_get_rejects_invalid_series_per_frame(series_per_frame):
+    with mock.patch('knoema._get_client', side_effect=AssertionError('client should not be used')):
+        with pytest.raises(ValueError, match='series_per_frame'):
+            knoema.iter_get('IMFWEO2017Oct', series_per_frame=series_per_frame)
+
+
+def _baseline_details_frame(data_resp):
+    # rows are converted one by one as before columns were built in one pass
+    titles = []
+    columns = []
+    indexes = []
+    for col in data_resp.columns:
+        indexes.append(col['index'])
+        if col['dimensionId'] != None:
+            if 'detailColumns' in col:
+                titles.append(col['name'])
+                columns.append([col['id'], 'name'])
+                for detail in col['detailColumns']:
+                    indexes.append(detail['index'])
+                    titles.append(detail['name'])
+                    columns.append([col['id'], detail['id']])
+            else:
+                titles.append(col['name'])
+                columns.append(col['id'])
+        elif col['type'] == 'Date' or col['type'] == 'Currency':
+            titles.append(col['name'])
+            columns.append([col['id'], 'value'])
+        else:
+            titles.append(col['name'])
+            columns.append(col['id'])
+
+    titles, columns = zip(*[x for _, x in sorted(zip(indexes, zip(titles, columns)))])
+    records = []
+    for row in data_resp.tuples:
+        record = []
+        for col in columns:
+            if isinstance(col, str):
+                record.append(row[col])
+            else:
+                val = row[col[0]]
+                record.append(val[col[1]] if val != None else None)
+        records.append(record)
+    return pandas.DataFrame(data=records, columns=titles)
+
+
+_details_columns = [
+    {'index': 4, 'id': 'amount', 'name': 'Amount', 'dimensionId': None, 'type': 'Number'},
+    {'index': 0, 'id': 'country', 'name': 'Country', 'dimensionId': 'country', 'type': 'Dimension',
+     'detailColumns': [{'index': 2, 'id': 'region', 'name': 'Region'}, {'index': 1, 'id': 'code', 'name': 'Code'}]},
+    {'index': 5, 'id': 'date', 'name': 'Date', 'dimensionId': None, 'type': 'Date'},
+    {'index': 3, 'id': 'product', 'name': 'Product', 'dimensionId': 'product', 'type': 'Dimension'},
+    {'index': 7, 'id': 'price', 'name': 'Price', 'dimensionId': None, 'type': 'Currency'},
+    {'index': 6, 'id': 'note', 'name': 'Note', 'dimensionId': None, 'type': 'String'},
+]
+
+_details_rows = [
+    {'amount': 1.5, 'country': {'name': 'Ukraine', 'region': 'Europe', 'code': 'UA'}, 'date': {'value': '2020-01-01T00:00:00Z'},
+     'product': 'Wheat', 'price': {'value': 10, 'currency': 'USD'}, 'note': 'first'},
+    {'amount': None, 'country': {'name': 'Kenya', 'region': None, 'code': 'KE'}, 'date': None,
+     'product': 'Corn', 'price': None, 'note': None},
+    {'amount': 3, 'country': None, 'date': {'value': '2021-06-30T00:00:00Z'},
+     'product': None, 'price': {'value': 12.25, 'currency': 'EUR'}, 'note': 'third'},
+    {'amount': 4, 'country': {'name': 'Ukraine', 'region': 'Europe', 'code': 'UA'}, 'date': {'value': '2022-01-01T00:00:00Z'},
+     'product': 'Wheat', 'price': {'value': None, 'currency': None}, 'note': ''},
+]
+
+
+def _details_frame(rows):
+    data_resp = definition.DetailsResponse({'columns': _details_columns, 'data': rows})
+    reader = mock.Mock(include_metadata=False, layout='wide', backend='pandas', dataset=None)
+    return DetailsResponseReader(reader, data_resp).convert_pandasframe(), _baseline_details_frame(data_resp)
+
+
+def test_details_frame_equals_row_by_row_conversion():
+    frame, expected = _details_frame(_details_rows)
+
+    assert list(frame.columns) == list(expected.columns) == ['Country', 'Code', 'Region', 'Product', 'Amount', 'Date', 'Note', 'Price']
+    for column in frame.columns:
+        values = [None if pandas.isna(value) else value for value in frame[column].tolist()]
+        expected_values = [None if pandas.isna(value) else value for value in expected[column].tolist()]
+        assert values == expected_values, column
+
+    # names of dimension members are categorical, values of their detail columns are not
+    assert [column for column in frame.columns if isinstance(frame[column].dtype, pandas.CategoricalDtype)] == ['Country', 'Product']
+    assert list(frame['Country'].cat.categories) == ['Kenya', 'Ukraine']
+    assert frame['Amount'].dtype == expected['Amount'].dtype
+
+
+def test_details_frame_without_rows():
+    frame, expected = _details_frame([])
+
+    assert list(frame.columns) == ['Country', 'Code', 'Region', 'Product', 'Amount', 'Date', 'Note', 'Price']
+    assert len(frame.index) == len(expected.index) == 0
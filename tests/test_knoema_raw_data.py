@@ -0,0 +1,196 @@
+import io
+import json
+import http.client
+import time
+from unittest import mock
+
+import pytest
+
+from knoema.api_client import ApiClient, JsonArrayStream, RawDataPager
+from knoema.api_transport import RetryPolicy
+
+
+_pages = {
+    None: {'continuationToken': 't1', 'descriptor': {'detailColumns': None}, 'data': [{'id': 1}, {'id': 2}, {'id': 3}]},
+    't1': {'data': [{'id': 4}, {'id': 5}], 'continuationToken': 't2'},
+    't2': {'continuationToken': None, 'data': [{'id': 6}]},
+}
+
+
+class _BrokenResponse(io.BytesIO):
+
+    def read(self, size=-1):
+        if self.tell() > 20:
+            raise http.client.IncompleteRead(b'')
+        return super().read(5)
+
+
+def _response(token, broken=()):
+    body = json.dumps(_pages[token]).encode()
+    return _BrokenResponse(body) if token in broken else io.BytesIO(body)
+
+
+def test_series_of_all_pages_are_yielded_one_by_one():
+    pager = RawDataPager(lambda: _response(None), _response)
+
+    items = list(pager.iter_series())
+
+    assert [series['id'] for _, series in items] == [1, 2, 3, 4, 5, 6]
+    assert items[0][0]['descriptor'] == {'detailColumns': None}
+    assert items[0][0] is items[2][0]
+    assert items[3][0] is not items[2][0]
+
+
+def test_broken_page_is_loaded_again_without_repeated_series():
+    broken = {'t1'}
+
+    def next_response(token):
+        response = _response(token, broken)
+        broken.discard(token)
+        return response
+
+    with mock.patch('knoema.api_client.time.sleep'):
+        pager = RawDataPager(lambda: _response(None), next_response, retry=RetryPolicy(total=1))
+        ids = [series['id'] for _, series in pager.iter_series()]
+
+    assert ids == [1, 2, 3, 4, 5, 6]
+
+
+class _Pages(object):
+    """Fake transport which serves a chain of pages and records requested tokens"""
+
+    def __init__(self, count, broken=()):
+        self.count = count
+        self.broken = set(broken)
+        self.requested = []
+
+    def first_response(self):
+        return self.next_response('p0')
+
+    def next_response(self, token):
+        self.requested.append(token)
+        index = int(token[1:])
+        body = {
+            'continuationToken': 'p{}'.format(index + 1) if index + 1 < self.count else None,
+            'data': [{'id': index * 10 + i} for i in range(3)]}
+        if token in self.broken:
+            self.broken.discard(token)
+            return _BrokenResponse(json.dumps(body).encode())
+        return io.BytesIO(json.dumps(body).encode())
+
+
+def test_pages_are_yielded_in_order():
+    pages = _Pages(8)
+    pager = RawDataPager(pages.first_response, pages.next_response, lookahead=3)
+
+    ids = [[series['id'] for series in page.series] for page in pager]
+
+    assert ids == [[i * 10, i * 10 + 1, i * 10 + 2] for i in range(8)]
+    assert pages.requested == ['p{}'.format(i) for i in range(8)]
+
+
+@pytest.mark.parametrize('lookahead', [1, 2, 3])
+def test_pages_are_not_requested_ahead_more_than_lookahead(lookahead):
+    pages = _Pages(10)
+    pager = RawDataPager(pages.first_response, pages.next_response, lookahead=lookahead)
+
+    ahead = []
+    for consumed, _ in enumerate(pager, 1):
+        # the consumer is slow, so the pager has time to request all pages it may
+        time.sleep(0.05)
+        ahead.append(len(pages.requested) - consumed)
+
+    assert max(ahead) == lookahead
+    assert len(pages.requested) == 10
+
+
+def test_pages_are_not_requested_after_break():
+    pages = _Pages(10)
+    pager = RawDataPager(pages.first_response, pages.next_response, lookahead=2)
+
+    for consumed, _ in enumerate(pager, 1):
+        if consumed == 2:
+            break
+    time.sleep(0.1)
+    requested = len(pages.requested)
+    time.sleep(0.1)
+
+    assert requested <= 2 + 2
+    assert len(pages.requested) == requested
+
+
+def test_failed_page_is_requested_again():
+    pages = _Pages(4, broken={'p2'})
+
+    with mock.patch('knoema.api_client.time.sleep'):
+        pager = RawDataPager(pages.first_response, pages.next_response, retry=RetryPolicy(total=1))
+        ids = [series['id'] for page in pager for series in page.series]
+
+    assert ids == [i * 10 + j for i in range(4) for j in range(3)]
+    assert pages.requested == ['p0', 'p1', 'p2', 'p2', 'p3']
+
+
+def test_failed_page_is_raised_without_retries():
+    pages = _Pages(4, broken={'p1'})
+    pager = RawDataPager(pages.first_response, pages.next_response)
+
+    with pytest.raises(http.client.IncompleteRead):
+        list(pager)
+
+
+def test_iter_data_raw_yields_series():
+    client = ApiClient('knoema.com')
+    with mock.patch.object(client, '_api_post_json_response', return_value=_response(None)), \
+         mock.patch.object(client, '_api_get_response', side_effect=lambda path: _response(path.split('continuationToken=')[1])):
+        request = mock.Mock(save_to_json=lambda: '{}')
+        assert [series['id'] for series in client.iter_data_raw(request)] == [1, 2, 3, 4, 5, 6]
+
+
+_body = {
+    'continuationToken': 'token \\ with "escapes"',
+    'data': [
+        {'name': 'Kyiv \u041a\u0438\u0457\u0432 \u20ac\U0001f600', 'values': [1, -2.5, 3e-05, 12345678901234567890, 1.0e+10, None]},
+        {'name': 'quote " backslash \\ slash / tab \t newline \n', 'values': [0, 0.125, -7e20]},
+        [], 'x', 42, -0.5, True, None,
+    ],
+    'descriptor': {'detailColumns': [{'name': 'Note'}]},
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64 * 1024])
+def test_stream_decodes_items_split_at_any_chunk_boundary(chunk_size):
+    text = json.dumps(_body, ensure_ascii=False)
+    stream = JsonArrayStream(io.BytesIO(('\ufeff ' + text).encode('utf-8')), 'data', chunk_size)
+
+    assert list(stream) == _body['data']
+    assert stream.fields == {'continuationToken': _body['continuationToken'], 'data': None, 'descriptor': _body['descriptor']}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64 * 1024])
+def test_stream_decodes_numbers_cut_by_chunks(chunk_size):
+    stream = JsonArrayStream(io.BytesIO(b'{"data":[123456,7.5e-3,-0.25,1E+2],"continuationToken":null}'), 'data', chunk_size)
+    assert list(stream) == [123456, 7.5e-3, -0.25, 1E+2]
+    assert stream.fields['continuationToken'] is None
+
+
+def test_stream_of_empty_array():
+    stream = JsonArrayStream(io.BytesIO(b'{"data": [ ], "continuationToken": null}'), 'data')
+    assert list(stream) == []
+    assert stream.fields == {'data': None, 'continuationToken': None}
+
+
+def test_stream_raises_message_of_server():
+    with pytest.raises(ValueError, match='Dataset not found'):
+        list(JsonArrayStream(io.BytesIO(b'"Dataset not found"'), 'data'))
+
+
+def test_stream_raises_on_truncated_body():
+    with pytest.raises(ValueError):
+        list(JsonArrayStream(io.BytesIO(b'{"data": [{"id": 1}, {"id"'), 'data', 4))
+
+
+def test_stream_is_iterated_once():
+    stream = JsonArrayStream(io.BytesIO(b'{"data": []}'), 'data')
+    list(stream)
+    with pytest.raises(ValueError):
+        list(stream)
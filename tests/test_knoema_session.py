@@ -0,0 +1,75 @@
+import types
+from unittest import mock
+
+import knoema
+from knoema.api_client import ApiClient
+from knoema.api_session import ClientRegistry, get_registry
+from knoema.api_transport import RetryPolicy
+
+
+def test_session_reuses_client(get_client):
+    with knoema.session() as registry:
+        assert get_registry() is registry
+
+        client = registry.get_client(knoema.ApiConfig())
+        assert registry.get_client(knoema.ApiConfig()) is client
+        assert knoema._get_client() is client
+
+    assert get_registry() is not registry
+
+
+def test_session_closes_client(get_client):
+    with mock.patch.object(ApiClient, 'close') as close:
+        with knoema.session() as registry:
+            registry.get_client(knoema.ApiConfig())
+            close.assert_not_called()
+
+    close.assert_called_once_with()
+
+
+def test_session_client_differs_from_process_client(get_client):
+    process_client = knoema._get_client()
+    with knoema.session():
+        assert knoema._get_client() is not process_client
+    assert knoema._get_client() is process_client
+
+
+def _config(**kwargs):
+    # ApiConfig is shared by the process, so its copy is changed
+    options = dict(vars(knoema.ApiConfig()), host='knoema.com', app_id=None, app_secret=None)
+    options.update(kwargs)
+    return types.SimpleNamespace(**options)
+
+
+def test_equal_retry_policies_share_client():
+    registry = ClientRegistry()
+
+    client = registry.get_client(_config(retry=RetryPolicy(total=5)))
+
+    assert registry.get_client(_config(retry=RetryPolicy(total=5))) is client
+    assert registry.get_client(_config(retry=RetryPolicy(total=5, status_forcelist=[429, 500, 502, 503, 504]))) is client
+    assert len(registry._clients) == 1
+
+
+def test_client_with_changed_settings_replaces_previous():
+    registry = ClientRegistry()
+    client = registry.get_client(_config(retry=RetryPolicy(total=5)))
+
+    with mock.patch.object(client, 'close') as close:
+        replacing = registry.get_client(_config(retry=RetryPolicy(total=1)))
+        close.assert_called_once_with()
+
+    assert replacing is not client
+    assert registry.get_client(_config(retry=RetryPolicy(total=1))) is replacing
+    assert len(registry._clients) == 1
+
+
+def test_clients_of_different_hosts_are_kept():
+    registry = ClientRegistry()
+
+    client = registry.get_client(_config())
+    other = registry.get_client(_config(host='example.knoema.com'))
+
+    assert other is not client
+    assert registry.get_client(_config()) is client
+    assert len(registry._clients) == 2
@@ -0,0 +1,353 @@
+import io
+import email.message
+import gzip
+import http.client
+import http.server
+import json
+import threading
+import time
+import zlib
+from unittest import mock
+from urllib.error import HTTPError
+
+import pytest
+from knoema.api_client import ApiClient
+from knoema.api_transport import ConnectionPool, RetryPolicy
+
+
+def _http_error(code, retry_after=None):
+    headers = email.message.Message()
+    if retry_after is not None:
+        headers['Retry-After'] = retry_after
+    return HTTPError('http://knoema.com/api', code, 'error', headers, io.BytesIO())
+
+
+def _call_failing(policy, method, errors):
+    responses = list(errors) + ['ok']
+
+    def func():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    with mock.patch('knoema.api_transport.time.sleep') as sleep:
+        result = policy.call(method, func)
+    return result, [call.args[0] for call in sleep.call_args_list]
+
+
+@pytest.mark.parametrize('code', [429, 503])
+def test_retry_after_is_honoured(code):
+    result, delays = _call_failing(RetryPolicy(total=3), 'GET', [_http_error(code, '7'), _http_error(code, '2')])
+
+    assert result == 'ok'
+    assert delays == [7, 2]
+
+
+def test_post_is_retried_after_429_only():
+    result, delays = _call_failing(RetryPolicy(total=3), 'POST', [_http_error(429, '1')])
+    assert result == 'ok'
+    assert delays == [1]
+
+    with pytest.raises(HTTPError):
+        _call_failing(RetryPolicy(total=3), 'POST', [_http_error(503, '1')])
+
+
+def test_backoff_is_used_without_retry_after():
+    result, delays = _call_failing(RetryPolicy(total=3, backoff_factor=0.5, max_backoff=1), 'GET', [_http_error(503)] * 3)
+
+    assert result == 'ok'
+    assert len(delays) == 3
+    assert all(0 <= delay <= 1 for delay in delays)
+
+
+def test_retries_are_limited_by_total():
+    with pytest.raises(HTTPError) as error:
+        _call_failing(RetryPolicy(total=2), 'GET', [_http_error(503, '0')] * 3)
+    assert error.value.code == 503
+
+
+def test_status_out_of_forcelist_is_not_retried():
+    with pytest.raises(HTTPError) as error:
+        _call_failing(RetryPolicy(total=3), 'GET', [_http_error(404)])
+    assert error.value.code == 404
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.requests.append((self.command, self.path, self.client_address[1], body, self.headers))
+
+        route = self.server.routes.get(self.path.split('?')[0], _ok)
+        status, headers, content = route(self, body)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if isinstance(content, list):
+            # the body is sent by chunks
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in content:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            if not any(name == 'Content-Length' for name, _ in headers):
+                self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        if self.path.startswith('/drop'):
+            # the keep-alive connection is dropped by the server without notice to the client
+            self.close_connection = True
+
+
+def _ok(handler, body):
+    return 200, [], b'ok'
+
+
+@pytest.fixture()
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.requests = []
+    httpd.routes = {}
+    httpd.url = 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _pool(**kwargs):
+    pool = ConnectionPool(**kwargs)
+    # requests to the local server don't go through proxies of the environment
+    pool._proxies = {}
+    return pool
+
+
+def _ports(server):
+    return [request[2] for request in server.requests]
+
+
+def test_connection_is_reused(server):
+    pool = _pool()
+    for _ in range(3):
+        assert pool.request('GET', server.url + '/data').read() == b'ok'
+
+    assert len(set(_ports(server))) == 1
+    pool.close()
+
+
+def test_idle_connection_expires(server):
+    pool = _pool(idle_timeout=0.05)
+    pool.request('GET', server.url + '/data').read()
+    time.sleep(0.1)
+    pool.request('GET', server.url + '/data').read()
+
+    assert len(set(_ports(server))) == 2
+    pool.close()
+
+
+def test_connection_dropped_by_server_is_replaced(server):
+    pool = _pool()
+    assert pool.request('GET', server.url + '/drop').read() == b'ok'
+    time.sleep(0.05)
+    assert pool.request('GET', server.url + '/data').read() == b'ok'
+
+    assert [request[1] for request in server.requests] == ['/drop', '/data']
+    assert len(set(_ports(server))) == 2
+    pool.close()
+
+
+@pytest.mark.parametrize('code', [302, 303])
+def test_post_is_redirected_as_get(server, code):
+    server.routes['/post'] = lambda handler, body: (code, [('Location', '/target')], b'')
+    pool = _pool()
+
+    resp = pool.request('POST', server.url + '/post', b'{"a": 1}', {'Content-Type': 'application/json'})
+
+    assert resp.read() == b'ok'
+    assert resp.geturl() == server.url + '/target'
+    (method, path, _, body, headers), (redirected_method, redirected_path, _, redirected_body, redirected_headers) = server.requests
+    assert (method, path, body) == ('POST', '/post', b'{"a": 1}')
+    assert (redirected_method, redirected_path, redirected_body) == ('GET', '/target', b'')
+    assert 'Content-Type' not in redirected_headers
+    pool.close()
+
+
+def test_body_of_error_is_readable(server):
+    server.routes['/missing'] = lambda handler, body: (404, [], b'"Dataset not found"')
+    pool = _pool()
+
+    with pytest.raises(HTTPError) as error:
+        pool.request('GET', server.url + '/missing')
+
+    assert error.value.code == 404
+    assert error.value.read() == b'"Dataset not found"'
+    pool.close()
+
+
+def test_idle_connections_are_limited_by_pool_size(server):
+    pool = _pool(pool_size=2)
+    responses = [pool.request('GET', server.url + '/data') for _ in range(4)]
+    assert len(set(_ports(server))) == 4
+
+    for resp in responses:
+        resp.read()
+    assert len(pool._idle[('http', server.url[len('http://'):])]) == 2
+
+    for _ in range(4):
+        pool.request('GET', server.url + '/data').read()
+    assert len(set(_ports(server))) == 4
+    pool.close()
+
+
+_CONTENT = json.dumps([{'Id': i, 'Name': 'Series {}'.format(i)} for i in range(3000)]).encode()
+
+def _raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+_ENCODINGS = [
+    ('gzip', gzip.compress),
+    ('deflate', zlib.compress),
+    ('deflate', _raw_deflate),
+]
+
+def _compressed_route(encoding, compress, chunked):
+    def route(handler, body):
+        content = compress(_CONTENT)
+        if chunked:
+            content = [content[i:i + 1000] for i in range(0, len(content), 1000)]
+        return 200, [('Content-Encoding', encoding)], content
+    return route
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+@pytest.mark.parametrize('encoding,compress', _ENCODINGS, ids=['gzip', 'zlib', 'raw-deflate'])
+def test_compressed_content_is_decompressed(server, encoding, compress, chunked):
+    server.routes['/data'] = _compressed_route(encoding, compress, chunked)
+    pool = _pool()
+
+    assert pool.request('GET', server.url + '/data').read() == _CONTENT
+
+    # the connection is returned to the pool once the compressed body is read
+    assert pool.request('GET', server.url + '/data').read() == _CONTENT
+    assert len(set(_ports(server))) == 1
+    pool.close()
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+@pytest.mark.parametrize('encoding,compress', _ENCODINGS, ids=['gzip', 'zlib', 'raw-deflate'])
+def test_compressed_content_is_read_by_small_parts(server, encoding, compress, chunked):
+    server.routes['/data'] = _compressed_route(encoding, compress, chunked)
+    pool = _pool()
+
+    resp = pool.request('GET', server.url + '/data')
+    parts = []
+    while True:
+        part = resp.read(7)
+        if not part:
+            break
+        assert len(part) <= 7
+        parts.append(part)
+
+    assert b''.join(parts) == _CONTENT
+    pool.close()
+
+
+def test_plain_chunked_content_is_read(server):
+    server.routes['/data'] = lambda handler, body: (200, [], [_CONTENT[i:i + 1000] for i in range(0, len(_CONTENT), 1000)])
+    pool = _pool()
+
+    resp = pool.request('GET', server.url + '/data')
+    assert resp.read(10) == _CONTENT[:10]
+    assert resp.read() == _CONTENT[10:]
+    pool.close()
+
+
+@pytest.mark.parametrize('size,compressed', [(99, False), (100, True), (101, True)])
+def test_request_is_compressed_from_threshold(server, size, compressed):
+    client = ApiClient(server.url, request_compression_threshold=100)
+    client._transport._proxies = {}
+    request = json.dumps({'Data': 'x' * (size - len('{"Data": ""}'))})
+    assert len(request) == size
+
+    assert client._api_post_json_response('/api/1.0/data/pivot', request).read() == b'ok'
+
+    _, _, _, body, headers = server.requests[0]
+    if compressed:
+        assert headers.get('Content-Encoding') == 'gzip'
+        assert gzip.decompress(body).decode() == request
+    else:
+        assert 'Content-Encoding' not in headers
+        assert body.decode() == request
+    client.close()
+
+
+def test_request_is_not_compressed_without_threshold(server):
+    client = ApiClient(server.url)
+    client._transport._proxies = {}
+
+    client._api_post_json_response('/api/1.0/data/pivot', json.dumps({'Data': 'x' * 100000})).read()
+
+    assert 'Content-Encoding' not in server.requests[0][4]
+    client.close()
+
+
+def _truncated_once_route(content):
+    # the first response is cut by the server in the middle of the body
+    calls = []
+
+    def route(handler, body):
+        calls.append(handler.path)
+        if len(calls) == 1:
+            return 200, [('Content-Length', str(len(content))), ('Connection', 'close')], content[:len(content) // 2]
+        return 200, [], content
+    return route
+
+
+def test_get_with_truncated_body_is_repeated(server):
+    server.routes['/api/1.0/meta/dataset/IMFWEO2017Oct'] = _truncated_once_route(b'{"id": "IMFWEO2017Oct", "name": "World Economic Outlook"}')
+    client = ApiClient(server.url, retry=RetryPolicy(total=2))
+    client._transport._proxies = {}
+
+    with mock.patch('knoema.api_transport.time.sleep'):
+        data = client._api_get_json('/api/1.0/meta/dataset/IMFWEO2017Oct')
+
+    assert data == {'id': 'IMFWEO2017Oct', 'name': 'World Economic Outlook'}
+    assert len(server.requests) == 2
+    client.close()
+
+
+def test_truncated_body_is_raised_without_retries(server):
+    server.routes['/data'] = _truncated_once_route(_CONTENT)
+    pool = _pool()
+
+    with pytest.raises(http.client.IncompleteRead):
+        pool.request('GET', server.url + '/data', read=lambda resp: resp.read())
+    assert len(server.requests) == 1
+    pool.close()
+
+
+def test_truncated_body_of_post_is_not_repeated(server):
+    server.routes['/data'] = _truncated_once_route(_CONTENT)
+    pool = _pool(retry=RetryPolicy(total=2))
+
+    with mock.patch('knoema.api_transport.time.sleep'), pytest.raises(http.client.IncompleteRead):
+        pool.request('POST', server.url + '/data', b'{}', read=lambda resp: resp.read())
+    assert len(server.requests) == 1
+    pool.close()
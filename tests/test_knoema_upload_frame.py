@@ -0,0 +1,64 @@
+import csv
+import io
+
+import numpy
+import pandas
+
+from knoema.upload_frame import FileLayerWrapper, FrameTransformerRegular
+
+
+def _data_rows(frame):
+    transformer = FrameTransformerRegular(frame, [], [], [])
+    dimensions, freq_index, scale_index, unit_index = transformer._parse_dimension_list(frame.columns.names)
+    _, dimensions_map = transformer._dimension_sheets(dimensions, frame.columns.values)
+    _, frames = transformer._data_sheet(frame, dimensions, dimensions_map, freq_index, scale_index, unit_index, frame.columns.values)
+    return ''.join(data.to_csv(header=False, index=False, na_rep='', date_format='%Y-%m-%d') for data in frames).splitlines()
+
+
+def test_values_keep_types_of_their_series():
+    columns = pandas.MultiIndex.from_tuples([('Albania', 'GDP'), ('Angola', 'GDP')], names=['Country', 'Indicator'])
+    frame = pandas.DataFrame([[1, 1.5], [2, numpy.nan], [3, 2.25]], index=pandas.date_range('2020-01-01', periods=3, freq='YS'), columns=columns)
+
+    assert _data_rows(frame) == [
+        'ALBANIA,GDP,A,2020-01-01,1',
+        'ALBANIA,GDP,A,2021-01-01,2',
+        'ALBANIA,GDP,A,2022-01-01,3',
+        'ANGOLA,GDP,A,2020-01-01,1.5',
+        'ANGOLA,GDP,A,2021-01-01,',
+        'ANGOLA,GDP,A,2022-01-01,2.25',
+    ]
+
+
+def _rows_of_csv_writer(frame):
+    # rows are written as by the previous writer of flat frames, cells are converted by str
+    output = io.StringIO(newline='')
+    writer = csv.writer(output)
+    writer.writerow(list(frame.columns))
+    nan_frame = frame.isnull()
+    for row, nan_row in zip(frame.values, nan_frame.values):
+        writer.writerow(['' if nan_item else str(item) for item, nan_item in zip(row, nan_row)])
+    return output.getvalue()
+
+
+def _rows_of_frame_writer(frame, chunk_size):
+    output = io.StringIO(newline='')
+    FileLayerWrapper()._frame_to_csv(output, frame, True, chunk_size)
+    return output.getvalue()
+
+
+def test_flat_frame_is_written_as_by_csv_writer():
+    frame = pandas.DataFrame({
+        'Country': ['Albania', 'Comma, "quoted"', None, 'Line\nbreak'],
+        'Amount': [1, 2, 3, 4],
+        'Value': [1.5, numpy.nan, 1e20, 0.1 + 0.2],
+        'Date': pandas.to_datetime(['2020-01-01', '2020-02-01', None, '2020-04-01']),
+        'Time': pandas.to_datetime(['2020-01-01 00:00:00.5', '2020-01-01 10:30:00', '2020-01-02', '2020-01-03'], format='ISO8601'),
+        'Updated': pandas.to_datetime(['2020-01-01', '2020-01-02 12:00', '2020-01-03', '2020-01-04'], format='ISO8601').tz_localize('UTC'),
+        'Flag': [True, False, True, None],
+    })
+
+    expected = _rows_of_csv_writer(frame)
+    assert _rows_of_frame_writer(frame, 100000) == expected
+    assert _rows_of_frame_writer(frame, 3) == expected
+    assert '2020-01-01 00:00:00+00:00' in expected
+    assert '2020-01-01 00:00:00.500000' in expected